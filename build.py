@@ -1,28 +1,55 @@
-import PyInstaller.__main__
-import customtkinter
+import multiprocessing
 import os
-import shutil
-
-# Get customtkinter path for add-data
-ctk_path = os.path.dirname(customtkinter.__file__)
-
-# Define separator based on OS
-sep = ";" if os.name == "nt" else ":"
-
-print("Building executable...")
-
-PyInstaller.__main__.run([
-    'folder_icon_changer.py',
-    '--name=IconChanger',
-    '--onefile',
-    '--windowed',  # No console window
-    f'--add-data={ctk_path}{sep}customtkinter', # Add ctk themes
-    f'--add-data=icons{sep}icons', # Add icons folder
-    '--hidden-import=PIL._tkinter_finder', # Sometimes needed
-    '--hidden-import=cairosvg',
-    '--hidden-import=packaging',
-    '--clean',
-])
-
-print("Build complete. Executable is in 'dist' folder.")
-print("Ensure the 'icons' folder is present next to the executable when running.")
+import sys
+
+from icon_changer.bundle import build_bundle
+
+
+def main():
+    # Imported here: the render workers spawned by build_bundle re-import
+    # this script and don't need them
+    import PyInstaller.__main__
+    import customtkinter
+
+    # Get customtkinter path for add-data
+    ctk_path = os.path.dirname(customtkinter.__file__)
+
+    # Define separator based on OS
+    sep = ";" if os.name == "nt" else ":"
+
+    # Pre-render every preview and precompute the icon catalog, so a fresh
+    # install shows the full grid without running cairosvg
+    prebuilt_dir = os.path.join("build", "prebuilt")
+    print("Pre-rendering icon previews...")
+    stats = build_bundle("icons", prebuilt_dir)
+    print(f"Packed {stats['atlas_tiles']} of {stats['icons']} previews in {stats['seconds']:.1f}s")
+    if stats["failed"]:
+        for svg_path, error in stats["failed"]:
+            print(f"  failed: {svg_path}: {error}", file=sys.stderr)
+        sys.exit("Pre-rendering failed; fix the icons above before building.")
+
+    print("Building executable...")
+
+    PyInstaller.__main__.run([
+        'folder_icon_changer.py',
+        '--name=IconChanger',
+        '--onefile',
+        '--windowed',  # No console window
+        f'--add-data={ctk_path}{sep}customtkinter', # Add ctk themes
+        f'--add-data=icons{sep}icons', # Add icons folder
+        f'--add-data={prebuilt_dir}{sep}prebuilt', # Precomputed catalog + preview atlas
+        '--hidden-import=PIL._tkinter_finder', # Sometimes needed
+        '--hidden-import=cairosvg',
+        '--hidden-import=packaging',
+        '--clean',
+    ])
+
+    print("Build complete. Executable is in 'dist' folder.")
+    print("Ensure the 'icons' folder is present next to the executable when running.")
+
+
+if __name__ == "__main__":
+    # build_bundle renders on a spawn-context process pool, whose workers
+    # import this file as __mp_main__: nothing may run at import time
+    multiprocessing.freeze_support()
+    main()
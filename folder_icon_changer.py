@@ -1,36 +1,65 @@
+import time
+_APP_START = time.perf_counter()
+
 import customtkinter as ctk
 import os
-import subprocess
 from pathlib import Path
 from PIL import Image
-import cairosvg
 import threading
-import json
-import urllib.request
-import webbrowser
-from packaging import version
+from collections import deque
 
+import argparse
+import multiprocessing
 import sys
 
-def resource_path(relative_path):
-    """ Get absolute path to resource, works for dev and for PyInstaller """
-    try:
-        # PyInstaller creates a temp folder and stores path in _MEIPASS
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-
-    return Path(os.path.join(base_path, relative_path))
-
-# Configuration
-ICON_DIR = resource_path("icons")
-CACHE_DIR = Path.home() / ".cache" / "folder-icon-changer"
-PREVIEW_DIR = CACHE_DIR / "previews"
-CONVERTED_DIR = CACHE_DIR / "converted"
+# Heavy or rarely needed modules (cairosvg, the update-check stack and the
+# headless apply core) are imported on first use, not here.
+from icon_changer.aliases import icon_aliases
+from icon_changer.atlas import ATLAS_NAME, Atlas, update_atlas
+from icon_changer.bundle import Bundle
+from icon_changer.cache import RenderCache
+from icon_changer.catalog import Catalog, CatalogWatcher, icon_dirs
+from icon_changer.config import CONVERTED_DIR, CONVERTED_SIZE, PREVIEW_DIR
+from icon_changer.imagecache import image_nbytes, images
+from icon_changer.rasterizers import ensure_selected
+from icon_changer.recolor import parse_variant
+from icon_changer.resolver import IconResolver, load_user_aliases
+from icon_changer.scheduler import PREFETCH, VISIBLE, RenderScheduler
+from icon_changer.search import IconSearchIndex
+from icon_changer.render import RenderEngine, preview_jobs, render_job
+from icon_changer.startup import StartupProfile
+from icon_changer.trace import tracer
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
+SEARCH_DEBOUNCE_MS = 120
+# Keep the network check out of the way of the first paint
+UPDATE_CHECK_DELAY_MS = 3000
+# A --startup-profile run that has painted no icon by then reports that and exits
+STARTUP_PROFILE_TIMEOUT_MS = 60000
+# Loaded thumbnails are handed to the UI at most once per frame, and each
+# flush stops after FRAME_BUDGET_MS so scrolling stays smooth while a page fills
+FRAME_MS = 16
+FRAME_BUDGET_MS = 8
+# --scroll-profile: scroll the folder grid top to bottom in this many frame-
+# paced steps, let the last page settle, then measure CPU use while idle
+SCROLL_PROFILE_STEPS = 240
+SCROLL_PROFILE_SETTLE_MS = 2000
+SCROLL_PROFILE_IDLE_MS = 10000
+STATS_REFRESH_MS = 1000
+# Colors offered for applied icons, as recolor variants (icon_changer/recolor.py)
+COLOR_VARIANTS = {
+    "Original colors": None,
+    "Red": "tint:#e53935",
+    "Orange": "tint:#fb8c00",
+    "Yellow": "tint:#fdd835",
+    "Green": "tint:#43a047",
+    "Blue": "tint:#1e88e5",
+    "Purple": "tint:#8e24aa",
+    "Gray": "tint:#757575",
+}
+
 APP_VERSION = "0.0.1"
 GITHUB_REPO = "https://github.com/VannsanNin/angkorFolderIcon.git" # TODO: Update this
 
@@ -38,6 +67,10 @@ class UpdateChecker:
     @staticmethod
     def check_for_updates(current_version_str):
         try:
+            import json
+            import urllib.request
+            from packaging import version
+
             url = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
             req = urllib.request.Request(url, headers={"User-Agent": "IconChangerApp"})
             
@@ -60,9 +93,205 @@ class UpdateChecker:
             print(f"Update check failed: {e}")
             return None
 
+class VirtualIconGrid:
+    """
+    Recycling icon grid on top of a CTkScrollableFrame.
+
+    A spacer sized to the whole result set gives the scrollbar its range, but
+    only the rows in view plus a small overscan get real buttons. Scrolling or
+    filtering rebinds those pooled buttons to other icons, so the number of Tk
+    widgets stays flat however many icons match.
+    """
+
+    def __init__(self, scroll_frame, on_select, on_need_images, on_release, columns=5, cell_size=110, overscan_rows=2):
+        self.scroll_frame = scroll_frame
+        self.canvas = scroll_frame._parent_canvas
+        self.on_select = on_select
+        # on_need_images(grid, [(index, svg_path, priority)]); on_release(grid, svg_path)
+        self.on_need_images = on_need_images
+        self.on_release = on_release
+        self.columns = columns
+        self.cell_size = cell_size
+        self.overscan_rows = overscan_rows
+
+        self.items = []
+        self._bound = {}  # item index -> button currently showing it
+        self._free = []  # pooled buttons not bound to any item
+        self._has_image = set()  # bound indices showing their real image
+        self._update_pending = False
+
+        self.placeholder = ctk.CTkImage(light_image=Image.new("RGBA", (64, 64)), size=(48, 48))
+        self.spacer = ctk.CTkFrame(scroll_frame, width=1, height=1, fg_color="transparent")
+        self.spacer.grid(row=0, column=0, columnspan=columns, sticky="ew")
+
+        # Rebind when the scroll position actually changes instead of polling
+        # yview(); a burst of scroll events collapses into one update
+        scrollbar_set = scroll_frame._scrollbar.set
+        def on_yview(first, last):
+            scrollbar_set(first, last)
+            self.request_update()
+        self.canvas.configure(yscrollcommand=on_yview)
+        self.canvas.bind("<Configure>", lambda e: self.request_update(), add="+")
+
+    def request_update(self):
+        if not self._update_pending:
+            self._update_pending = True
+            self.canvas.after_idle(self.update_view)
+
+    def set_items(self, items):
+        for index in list(self._bound):
+            self._release(index)
+        self.items = items
+
+        rows = -(-len(items) // self.columns)
+        self.spacer.configure(height=max(1, rows * self.cell_size))
+        self.canvas.yview_moveto(0)
+        self.update_view()
+
+    def visible_range(self):
+        """
+        Item indices as ((start, end), (view_start, view_end)): the first pair
+        should have a button (overscan included), the second is on screen.
+        """
+        frame_height = self.scroll_frame.winfo_height()
+        if not self.items or frame_height <= 1:
+            return (0, 0), (0, 0)
+        row_px = self.cell_size * self.scroll_frame._get_widget_scaling()
+        first, last = self.canvas.yview()
+        first_row = int(first * frame_height // row_px)
+        last_row = int(last * frame_height // row_px)
+        count = len(self.items)
+        cols = self.columns
+        bound = (max(0, first_row - self.overscan_rows) * cols, min(count, (last_row + 1 + self.overscan_rows) * cols))
+        return bound, (first_row * cols, min(count, (last_row + 1) * cols))
+
+    def update_view(self):
+        self._update_pending = False
+        (start, end), (view_start, view_end) = self.visible_range()
+
+        for index in [i for i in self._bound if not start <= i < end]:
+            self._release(index)
+
+        for index in range(start, end):
+            if index not in self._bound:
+                self._bind(index)
+
+        # On-screen cells first, then the overscan rows just around them.
+        # Re-asking for a queued icon only raises its priority.
+        wanted = [
+            (i, self.items[i], VISIBLE if view_start <= i < view_end else PREFETCH)
+            for i in range(start, end) if i not in self._has_image
+        ]
+        if wanted:
+            self.on_need_images(self, wanted)
+
+    def set_image(self, index, svg_path, ctk_image):
+        btn = self._bound.get(index)
+        if btn is None or self.items[index] != svg_path:
+            return
+        btn.configure(image=ctk_image)
+        self._has_image.add(index)
+
+    def _bind(self, index):
+        btn = self._free.pop() if self._free else self._create_button()
+        svg_path = self.items[index]
+
+        name = svg_path.stem.replace("folder-", "")
+        if len(name) > 15:
+            name = name[:12] + "..."
+
+        row, col = divmod(index, self.columns)
+        btn.configure(text=name, image=self.placeholder, command=lambda p=svg_path: self.on_select(p))
+        btn.place(relx=(col + 0.5) / self.columns, y=row * self.cell_size + 5, anchor="n")
+        self._bound[index] = btn
+
+    def _release(self, index):
+        btn = self._bound.pop(index)
+        btn.place_forget()
+        self._free.append(btn)
+        if index in self._has_image:
+            self._has_image.discard(index)
+        elif index < len(self.items):
+            self.on_release(self, self.items[index])
+
+    def _create_button(self):
+        btn = ctk.CTkButton(
+            self.scroll_frame,
+            text="",
+            image=self.placeholder,
+            compound="top",
+            fg_color="transparent",
+            width=100,
+            height=100,
+        )
+        # Bind scroll events to the button to ensure scrolling works when hovering
+        # Linux
+        btn.bind("<Button-4>", lambda e: self._on_mouse_scroll(e, -1))
+        btn.bind("<Button-5>", lambda e: self._on_mouse_scroll(e, 1))
+        # Windows/MacOS
+        btn.bind("<MouseWheel>", lambda e: self._on_mouse_scroll(e, 0))
+        return btn
+
+    def _on_mouse_scroll(self, event, direction):
+        # direction: -1 (up), 1 (down), 0 (mousewheel delta)
+        try:
+            if direction == 0:
+                # Windows/MacOS
+                self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+            else:
+                # Linux
+                self.canvas.yview_scroll(direction, "units")
+        except Exception:
+            pass
+
+class StatsWindow(ctk.CTkToplevel):
+    """
+    Live counters, span timings and recent failures from the tracer. Opening
+    it turns on event recording so the trace can be exported from here.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.title("Icon Changer - Stats")
+        self.geometry("620x480")
+        tracer.enable()
+
+        self.textbox = ctk.CTkTextbox(self, font=ctk.CTkFont(family="monospace", size=12), wrap="none")
+        self.textbox.pack(fill="both", expand=True, padx=10, pady=(10, 0))
+        self.btn_export = ctk.CTkButton(self, text="Export Trace...", command=self.export)
+        self.btn_export.pack(pady=10)
+        self.refresh()
+
+    def refresh(self):
+        if not self.winfo_exists():
+            return
+        lines = self.app.stats_lines()
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        self.textbox.insert("1.0", "\n".join(lines))
+        self.textbox.configure(state="disabled")
+        # Only polls while the window is open
+        self.after(STATS_REFRESH_MS, self.refresh)
+
+    def export(self):
+        from tkinter import filedialog
+
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".json", initialfile="icon-changer-trace.json")
+        if path:
+            tracer.write(path)
+
+
 class IconChangerApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, profile=None, profile_output=None, extra_icon_dirs=(), scroll_profile_output=None):
+        # profile_output / scroll_profile_output: where to write the
+        # --startup-profile / --scroll-profile report, if requested
+        self.profile = profile or StartupProfile(_APP_START)
+        self.profile_output = profile_output
+        self.scroll_profile_output = scroll_profile_output
+        self._profile_written = False
         super().__init__()
+        self.profile.mark("window created")
 
         self.title("Icon Changer")
         self.geometry("1000x700")
@@ -70,28 +299,44 @@ class IconChangerApp(ctk.CTk):
         self.selected_target = None # Can be folder or file path
         self.selected_icon_path = None
         
-        # We will keep references to buttons to destroy them on refresh/filter
-        self.folder_buttons = []
-        self.file_buttons = []
-
         # Data sources
         self.folder_icons_all = []
         self.file_icons_all = []
-
-        # Lazy Loading State
-        self.batch_size = 20
-        self.current_display_list = []
-        self.loaded_count = 0
-        self.is_loading = False
-        self.load_id = 0
-
-        # Ensure cache directories exist
-        PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
-        CONVERTED_DIR.mkdir(parents=True, exist_ok=True)
+        self.folder_search = IconSearchIndex([])
+        self.file_search = IconSearchIndex([])
+        self.resolver = IconResolver([])
+        self._search_after_id = None
+
+        # One prioritized, cancellable pool loads every thumbnail
+        self.scheduler = RenderScheduler(self.load_preview_image, self.on_image_loaded, workers=2)
+        # Finished thumbnails waiting for the next frame flush
+        self._ready = deque()
+        self._ready_lock = threading.Lock()
+        self._flush_scheduled = False
+
+        # Content-addressed render caches (directories are created on load)
+        self.preview_cache = RenderCache(PREVIEW_DIR)
+        self.converted_cache = RenderCache(CONVERTED_DIR)
+        self.atlas = Atlas.open(PREVIEW_DIR / ATLAS_NAME)
+        self.all_svgs = []
+
+        # Catalog and preview atlas precomputed at build time (empty when
+        # running from a source checkout)
+        self.bundle = Bundle.load()
+
+        # Bundled icons plus user packs, watched for changes once loaded
+        self.catalog = Catalog(icon_dirs(extra_icon_dirs), fixed=self.bundle.fixed_dirs())
+        self.watcher = None
+        # Record of applied icons, opened with the apply core on first use
+        self.journal = None
 
         self.setup_ui()
+        self.profile.mark("ui built")
         self.start_loading_icons()
-        self.check_for_updates_bg()
+        if self.profile_output is None and self.scroll_profile_output is None:
+            self.after(UPDATE_CHECK_DELAY_MS, self.check_for_updates_bg)
+        elif self.profile_output is not None:
+            self.after(STARTUP_PROFILE_TIMEOUT_MS, lambda: self.finish_startup_profile("timed out"))
 
     def check_for_updates_bg(self):
         threading.Thread(target=self._update_check_thread, daemon=True).start()
@@ -102,6 +347,8 @@ class IconChangerApp(ctk.CTk):
             self.after(0, lambda: self.show_update_button(update_url))
 
     def show_update_button(self, url):
+        import webbrowser
+
         self.btn_update = ctk.CTkButton(
             self.sidebar, 
             text="Update Available!", 
@@ -146,9 +393,26 @@ class IconChangerApp(ctk.CTk):
         self.btn_reset = ctk.CTkButton(self.sidebar, text="Reset Icon", command=self.reset_icon, state="disabled", fg_color="transparent", border_width=2)
         self.btn_reset.grid(row=5, column=0, padx=20, pady=(10, 20))
         
+        self.options_frame = ctk.CTkFrame(self.sidebar, fg_color="transparent")
+        self.options_frame.grid(row=7, column=0, padx=20, pady=(0, 10), sticky="ew")
+
+        # Recolor the applied icon from its cached render
+        self.color_var = ctk.StringVar(value=next(iter(COLOR_VARIANTS)))
+        self.color_menu = ctk.CTkOptionMenu(self.options_frame, values=list(COLOR_VARIANTS), variable=self.color_var, command=self.on_color_change)
+        self.color_menu.grid(row=0, column=0, pady=(0, 10), sticky="ew")
+
+        # Install into ~/.local/share/icons and reference the icon by name
+        self.themed_var = ctk.BooleanVar(value=False)
+        self.themed_check = ctk.CTkCheckBox(self.options_frame, text="Install to icon theme", variable=self.themed_var)
+        self.themed_check.grid(row=1, column=0, sticky="w")
+
         self.status_label = ctk.CTkLabel(self.sidebar, text=f"Ready (v{APP_VERSION})", text_color="gray", wraplength=180)
         self.status_label.grid(row=8, column=0, padx=20, pady=10)
 
+        self.btn_stats = ctk.CTkButton(self.sidebar, text="Stats", command=self.open_stats, width=80, fg_color="transparent", border_width=1)
+        self.btn_stats.grid(row=9, column=0, padx=20, pady=(0, 20))
+        self.stats_window = None
+
         # --- Main Area ---
         self.main_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.main_frame.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
@@ -177,51 +441,145 @@ class IconChangerApp(ctk.CTk):
         self.scroll_files.pack(fill="both", expand=True)
         self.scroll_files.grid_columnconfigure((0,1,2,3,4), weight=1)
 
-        # Start scroll check loop
-        self.check_scroll_loop()
-
-    def check_scroll_loop(self):
-        try:
-            current_tab = self.tabview.get()
-            if current_tab == "Folders":
-                scroll_frame = self.scroll_folders
-            else:
-                scroll_frame = self.scroll_files
-            
-            # yview returns (top_fraction, bottom_fraction)
-            # If bottom_fraction is near 1.0, we are at the bottom
-            _, bottom = scroll_frame._parent_canvas.yview()
-            if bottom > 0.90: # Trigger a bit earlier
-                self.load_more_icons()
-        except Exception:
-            pass
-        finally:
-            # Check every 300ms
-            self.after(300, self.check_scroll_loop)
+        # Virtualized grids: only visible rows get (recycled) buttons
+        self.folder_grid = VirtualIconGrid(self.scroll_folders, self.select_icon, self.load_icon_images, self.release_icon_image)
+        self.file_grid = VirtualIconGrid(self.scroll_files, self.select_icon, self.load_icon_images, self.release_icon_image)
 
     def start_loading_icons(self):
         self.status_label.configure(text="Loading icons...")
         threading.Thread(target=self.load_icons_thread, daemon=True).start()
 
     def load_icons_thread(self):
-        if not ICON_DIR.exists():
-            self.after(0, lambda: self.status_label.configure(text="Error: 'icons' dir missing"))
-            return
-
-        # Separate icons
-        all_svgs = sorted(list(ICON_DIR.glob("*.svg")))
-        
-        for svg in all_svgs:
-            if svg.name.startswith("folder-"):
-                self.folder_icons_all.append(svg)
+        # The persisted catalog lists every icon without touching the icon
+        # directories; only a first run (no snapshot yet) scans them here.
+        # On a fresh install the prebuilt catalog stands in until then.
+        with tracer.span("discover"):
+            self.catalog.load()
+            if len(self.catalog):
+                all_svgs = self.catalog.paths()
+            elif len(self.bundle):
+                all_svgs = self.bundle.svg_paths()
             else:
-                self.file_icons_all.append(svg)
-
-        # Generate thumbnails for all (this takes time, maybe do lazy load? 
-        # For now, we process all but update status).
-        # Actually, let's just trigger population of the current tab first.
+                self.catalog.refresh()
+                all_svgs = self.catalog.paths()
+        tracer.count("icons", len(all_svgs))
+
+        # One manifest read tells us what is cached, which is all the first
+        # page needs; search indexes are cheap and must exist before it shows.
+        # Bundled SVGs take their content hash from the build, not from disk.
+        with tracer.span("cache.load"):
+            self.preview_cache.load()
+            self.bundle.seed(self.preview_cache, all_svgs)
+        self.set_icons(all_svgs)
+        self.profile.mark("icons listed")
+
+        # Trigger population of the current tab first; everything below is
+        # off the critical path to the first painted icon.
         self.after(0, self.refresh_visible_icons)
-        self.after(0, lambda: self.status_label.configure(text="Icons found. Rendering..."))
+        self.after(0, lambda: self.status_label.configure(text="Icons found. Rendering..." if all_svgs else "No icons found"))
+        if not all_svgs:
+            self.after(0, lambda: self.finish_startup_profile("no icons"))
+
+        # Pick up whatever changed in the icon directories since the snapshot
+        if self.catalog.refresh() is not None:
+            all_svgs = self.catalog.paths()
+            self.set_icons(all_svgs)
+            self.after(0, self.refresh_visible_icons)
+
+        self.resolver = IconResolver(all_svgs, load_user_aliases())
+
+        # SVGs whose content changed since the last run get new keys and are
+        # re-rendered; then fill the rest of the preview cache across all cores.
+        self.converted_cache.load()
+        self.bundle.seed(self.preview_cache, all_svgs)
+        self.bundle.seed(self.converted_cache, all_svgs)
+        self.preview_cache.refresh_sources(all_svgs)
+        self.converted_cache.refresh_sources(all_svgs)
+
+        jobs = preview_jobs(self.unbundled(all_svgs), self.preview_cache)
+        if jobs:
+            threading.Thread(target=self.prewarm_previews_thread, args=(jobs,), daemon=True).start()
+        else:
+            self.atlas = update_atlas(PREVIEW_DIR / ATLAS_NAME, self.preview_cache, self.unbundled(all_svgs), 64)
+
+        # Drop a bounded number of orphaned previews per launch. Converted
+        # renders are never evicted: applied targets point at them by path.
+        self.preview_cache.evict_orphans(limit=200)
+        self.preview_cache.save()
+        self.converted_cache.save()
+
+        # From now on icon packs can change under us
+        self.watcher = CatalogWatcher(self.catalog, self.on_catalog_change).start()
+
+    def set_icons(self, all_svgs):
+        # Split into the two tabs and index them; the attributes are swapped
+        # in at the end so the UI never sees a half-built state.
+        folders = [svg for svg in all_svgs if svg.name.startswith("folder-")]
+        files = [svg for svg in all_svgs if not svg.name.startswith("folder-")]
+        with tracer.span("index"):
+            aliases = icon_aliases()
+            folder_search = IconSearchIndex(folders, aliases)
+            file_search = IconSearchIndex(files, aliases)
+        self.all_svgs = all_svgs
+        self.folder_icons_all, self.file_icons_all = folders, files
+        self.folder_search, self.file_search = folder_search, file_search
+
+    def on_catalog_change(self, change):
+        # Runs on the watcher thread. Only added and changed icons are re-rendered.
+        for svg_path in change.changed + change.dropped:
+            images.discard(("pil", svg_path, 64))
+            images.discard(("ctk", svg_path, 48))
+        all_svgs = self.catalog.paths()
+        self.set_icons(all_svgs)
+        self.resolver = IconResolver(all_svgs, load_user_aliases())
+
+        # Re-hash only what changed: refresh_sources() would treat `touched`
+        # as the complete set and drop every other icon's record
+        touched = change.added + change.changed
+        for cache in (self.preview_cache, self.converted_cache):
+            for svg_path in touched:
+                try:
+                    cache.digest(svg_path)
+                except OSError:
+                    pass
+            # Including an override's path when its name falls back to
+            # another directory, so its renders become orphans too
+            cache.forget_sources(change.dropped)
+        summary = f"Icons updated: {len(change.added)} added, {len(change.removed)} removed, {len(change.changed)} changed"
+        self.after(0, self.refresh_visible_icons)
+        self.after(0, lambda: self.status_label.configure(text=summary))
+
+        jobs = preview_jobs(self.unbundled(touched), self.preview_cache)
+        if jobs:
+            self.prewarm_previews_thread(jobs)
+        elif change.dropped:
+            self.atlas = update_atlas(PREVIEW_DIR / ATLAS_NAME, self.preview_cache, self.unbundled(all_svgs), 64)
+
+    def unbundled(self, svg_paths):
+        # Icons without a tile in the prebuilt atlas: only these are rendered
+        # and packed into the user's own atlas
+        atlas = self.bundle.atlas
+        if not len(atlas):
+            return svg_paths
+        return [p for p in svg_paths if self.preview_cache.key(p, 64) not in atlas]
+
+    def prewarm_previews_thread(self, jobs):
+        # A first run benchmarks the rasterizers here, after the first page
+        # has been requested and before the pool workers read the choice
+        with tracer.span("rasterizer.select"):
+            ensure_selected()
+        engine = RenderEngine()
+        try:
+            for done, (svg_path, error) in enumerate(engine.render_many(jobs), 1):
+                if not error:
+                    self.preview_cache.record(Path(svg_path), 64)
+                if done % 50 == 0 or done == len(jobs):
+                    self.after(0, lambda d=done: self.status_label.configure(text=f"Rendered previews: {d}/{len(jobs)}"))
+            # Pack the fresh previews so later scrolls read straight from the atlas
+            self.atlas = update_atlas(PREVIEW_DIR / ATLAS_NAME, self.preview_cache, self.unbundled(self.all_svgs), 64)
+        finally:
+            engine.shutdown()
+            self.preview_cache.save()
 
     def on_tab_change(self):
         tab_name = self.tabview.get()
@@ -237,150 +595,198 @@ class IconChangerApp(ctk.CTk):
         self.refresh_visible_icons()
 
     def on_search(self, *args):
-        # Debounce could be good, but let's try direct first
-        self.refresh_visible_icons()
+        # Debounce: only commit once typing pauses
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self.refresh_visible_icons)
 
     def refresh_visible_icons(self):
+        self._search_after_id = None
         current_tab = self.tabview.get()
-        query = self.search_var.get().lower()
+        query = self.search_var.get()
 
         if current_tab == "Folders":
-            source_list = self.folder_icons_all
-            btn_list = self.folder_buttons
+            index = self.folder_search
+            grid = self.folder_grid
         else:
-            source_list = self.file_icons_all
-            btn_list = self.file_buttons
-
-        # Clear existing buttons
-        for btn in btn_list:
-            btn.destroy()
-        btn_list.clear()
-
-        # Update ID to invalidate old threads
-        self.load_id += 1
-
-        # Filter
-        self.current_display_list = [p for p in source_list if query in p.stem.lower()]
-        self.loaded_count = 0
-        
-        # Trigger initial load
-        self.load_more_icons()
-
-    def load_more_icons(self):
-        if self.is_loading:
-            return
-        
-        if self.loaded_count >= len(self.current_display_list):
+            index = self.file_search
+            grid = self.file_grid
+
+        # Drop queued loads and ignore in-flight ones for the old results
+        self.scheduler.cancel_all()
+
+        # Rank, then let the grid rebind its pooled buttons to the results
+        with tracer.span("search", query=query):
+            results = index.search(query)
+        with tracer.span("tk.rebind"):
+            grid.set_items(results)
+
+        if query.strip() and index.latencies:
+            _, ms, _ = index.latencies[-1]
+            self.status_label.configure(text=f"{len(results)} matches ({ms:.1f} ms)")
+
+    def load_icon_images(self, grid, requests):
+        # Called by the grid with (index, svg_path, priority) for cells lacking
+        # an image. Icons still in memory are shown at once; the rest are queued.
+        for index, svg_path, priority in requests:
+            ctk_image = images.get(("ctk", svg_path, 48))
+            if ctk_image is not None:
+                grid.set_image(index, svg_path, ctk_image)
+            else:
+                self.scheduler.submit(svg_path, priority, (grid, index))
+
+    def thumbnail(self, svg_path, image):
+        # One CTkImage per icon, shared by every button that shows it
+        ctk_image = images.get(("ctk", svg_path, 48))
+        if ctk_image is None:
+            ctk_image = ctk.CTkImage(light_image=image, dark_image=image, size=(48, 48))
+            # The scaled PhotoImage Tk keeps for display
+            images.put(("ctk", svg_path, 48), ctk_image, 48 * 48 * 4)
+        return ctk_image
+
+    def release_icon_image(self, grid, svg_path):
+        # The cell scrolled away before its image arrived
+        self.scheduler.discard(svg_path)
+
+    def on_image_loaded(self, svg_path, image, targets, generation):
+        # Runs on a scheduler worker thread: queue the result and make sure
+        # one flush is scheduled, rather than a main-thread callback per icon
+        if self.scheduler.pending() == 0:
+            self.preview_cache.save()
+        if image is None or not targets:
             return
-
-        self.is_loading = True
-        
-        current_tab = self.tabview.get()
-        if current_tab == "Folders":
-            parent_frame = self.scroll_folders
-            btn_list = self.folder_buttons
-        else:
-            parent_frame = self.scroll_files
-            btn_list = self.file_buttons
-
-        # Determine batch
-        start_index = self.loaded_count
-        end_index = min(self.loaded_count + self.batch_size, len(self.current_display_list))
-        batch = self.current_display_list[start_index:end_index]
-        
-        # Capture current load_id
-        current_load_id = self.load_id
-
-        # Start thread
-        threading.Thread(target=self.populate_icons_thread, args=(batch, start_index, current_load_id, parent_frame, btn_list), daemon=True).start()
-        
-        self.loaded_count = end_index
-
-    def populate_icons_thread(self, display_list, start_index, load_id, parent_frame, btn_list):
-        max_cols = 5
-        current_idx = start_index
-
-        for svg_path in display_list:
-            # Check if obsolete
-            if load_id != self.load_id:
-                self.is_loading = False
+        with self._ready_lock:
+            self._ready.append((targets, svg_path, image, generation))
+            if self._flush_scheduled:
                 return
-
-            # Calc row/col based on absolute index
-            row = current_idx // max_cols
-            col = current_idx % max_cols
-
-            # Prepare image
-            preview_path = PREVIEW_DIR / f"{svg_path.stem}.png"
-            if not preview_path.exists():
-                try:
-                    cairosvg.svg2png(url=str(svg_path), write_to=str(preview_path), output_width=64, output_height=64)
-                except:
-                    continue
-            
-            # Add to UI main thread
-            self.after(0, lambda p=preview_path, s=svg_path, r=row, c=col, lid=load_id, pf=parent_frame, bl=btn_list: self.add_button(p, s, r, c, lid, pf, bl))
-            
-            current_idx += 1
-        
-        self.is_loading = False
-
-    def add_button(self, preview_path, svg_path, row, col, load_id, parent_frame, btn_list):
-        if load_id != self.load_id:
-            return
-
+            self._flush_scheduled = True
+        self.after(FRAME_MS, self.flush_ready_images)
+
+    def flush_ready_images(self):
+        start = time.perf_counter()
+        deadline = start + FRAME_BUDGET_MS / 1000
+        delivered = 0
+        while time.perf_counter() < deadline:
+            with self._ready_lock:
+                if not self._ready:
+                    break
+                targets, svg_path, image, generation = self._ready.popleft()
+            delivered += self.deliver_icon_image(targets, svg_path, image, generation)
+        tracer.add_span("tk.insert", start, time.perf_counter() - start, icons=delivered)
+
+        with self._ready_lock:
+            more = bool(self._ready)
+            self._flush_scheduled = more
+        if more:
+            self.after(FRAME_MS, self.flush_ready_images)
+        if delivered:
+            self.after_first_paint()
+
+    def load_preview_image(self, svg_path):
+        # Decoded thumbnails are kept in the process-wide LRU
+        image = images.get(("pil", svg_path, 64))
+        if image is None:
+            image = self.decode_preview_image(svg_path)
+            if image is not None:
+                images.put(("pil", svg_path, 64), image, image_nbytes(image))
+        return image
+
+    def decode_preview_image(self, svg_path):
+        # Straight from the atlas if packed, else decode the PNG once here
+        key = self.preview_cache.key(svg_path, 64)
+        image = self.atlas.get(key)
+        if image is None:
+            image = self.bundle.atlas.get(key)
+        if image is not None:
+            tracer.count("atlas.hit")
+            return image
+
+        preview_path = self.preview_cache.lookup(svg_path, 64)
+        if preview_path is None:
+            preview_path = self.preview_cache.path_for(svg_path, 64)
+            _, error = render_job((svg_path, preview_path, 64))
+            if error:
+                return None
+            self.preview_cache.record(svg_path, 64)
         try:
-            name = svg_path.stem.replace("folder-", "")
-            if len(name) > 15:
-                name = name[:12] + "..."
-
-            img = ctk.CTkImage(light_image=Image.open(preview_path), dark_image=Image.open(preview_path), size=(48, 48))
-            
-            btn = ctk.CTkButton(
-                parent_frame, 
-                text=name, 
-                image=img, 
-                compound="top", 
-                fg_color="transparent", 
-                width=100,
-                height=100,
-                command=lambda p=svg_path: self.select_icon(p)
-            )
-            btn.grid(row=row, column=col, padx=5, pady=5)
-            btn_list.append(btn)
-            
-            # Bind scroll events to the button to ensure scrolling works when hovering
-            # Linux
-            btn.bind("<Button-4>", lambda e: self._on_mouse_scroll(e, parent_frame, -1))
-            btn.bind("<Button-5>", lambda e: self._on_mouse_scroll(e, parent_frame, 1))
-            # Windows/MacOS
-            btn.bind("<MouseWheel>", lambda e: self._on_mouse_scroll(e, parent_frame, 0))
-            
-        except Exception:
-            pass
+            with tracer.span("decode"):
+                image = Image.open(preview_path)
+                image.load()
+            return image
+        except Exception as e:
+            # Counted and listed in the stats panel; the PNG is re-rendered next time
+            tracer.failure("decode", svg_path, e)
+            self.preview_cache.discard(svg_path, 64)
+            return None
 
-    def _on_mouse_scroll(self, event, scroll_frame, direction):
-        # direction: -1 (up), 1 (down), 0 (mousewheel delta)
-        try:
-            if direction == 0:
-                # Windows/MacOS
-                scroll_frame._parent_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-            else:
-                # Linux
-                scroll_frame._parent_canvas.yview_scroll(direction, "units")
-            
-            # Optional: Check load trigger immediately for responsiveness
-            self.check_scroll_position_manual(scroll_frame)
-        except:
-            pass
-            
-    def check_scroll_position_manual(self, scroll_frame):
-         try:
-            _, bottom = scroll_frame._parent_canvas.yview()
-            if bottom > 0.90:
-                self.load_more_icons()  
-         except:
-             pass
+    def deliver_icon_image(self, targets, svg_path, image, generation):
+        if generation != self.scheduler.generation:
+            return False
+        ctk_image = self.thumbnail(svg_path, image)
+        for grid, index in targets:
+            grid.set_image(index, svg_path, ctk_image)
+        return True
+
+    def after_first_paint(self):
+        if self.profile.elapsed("first icon painted") is None:
+            self.update_idletasks()
+            self.profile.mark("first icon painted")
+            self.finish_startup_profile()
+            if self.scroll_profile_output is not None:
+                self.after(SCROLL_PROFILE_SETTLE_MS, self.run_scroll_profile)
+
+    def finish_startup_profile(self, no_paint_reason=None):
+        # Write the --startup-profile report once and close; a run that can't
+        # paint an icon (none found, no rasterizer) ends with a mark saying why
+        if self.profile_output is None or self._profile_written:
+            return
+        self._profile_written = True
+        if no_paint_reason is not None:
+            self.profile.mark(f"no icon painted ({no_paint_reason})")
+        self.profile.write(self.profile_output)
+        self.after(0, self.destroy)
+
+    def run_scroll_profile(self):
+        # Each step scrolls and forces the redraw; the gap between steps is
+        # the frame time the user would see (FRAME_MS when nothing overruns)
+        canvas = self.folder_grid.canvas
+        frame_ms, work_ms = [], []
+        inserts_before = tracer.stats()["spans"].get("tk.insert", {}).get("count", 0)
+
+        def step(i, last):
+            now = time.perf_counter()
+            if last is not None:
+                frame_ms.append((now - last) * 1000)
+            if i > SCROLL_PROFILE_STEPS:
+                self.after(SCROLL_PROFILE_SETTLE_MS, lambda: self.measure_idle(frame_ms, work_ms, inserts_before))
+                return
+            canvas.yview_moveto(i / SCROLL_PROFILE_STEPS)
+            self.update_idletasks()
+            work_ms.append((time.perf_counter() - now) * 1000)
+            self.after(FRAME_MS, step, i + 1, now)
+
+        step(0, None)
+
+    def measure_idle(self, frame_ms, work_ms, inserts_before):
+        from icon_changer.bench import summarize, write_report
+
+        inserts = tracer.stats()["spans"].get("tk.insert", {}).get("count", 0) - inserts_before
+        cpu, wall = time.process_time(), time.perf_counter()
+
+        def finish():
+            frames = summarize(frame_ms)
+            write_report({
+                "frames": frames,
+                "fps": 1000 / frames["median_ms"] if frame_ms else None,
+                "scroll_work": summarize(work_ms),
+                # Main-thread thumbnail flushes while scrolling (one per frame at most)
+                "tk_insert_flushes": inserts,
+                "idle_seconds": time.perf_counter() - wall,
+                "idle_cpu_percent": (time.process_time() - cpu) / (time.perf_counter() - wall) * 100,
+            }, self.scroll_profile_output)
+            self.destroy()
+
+        self.after(SCROLL_PROFILE_IDLE_MS, finish)
 
     def select_target(self):
         tab = self.tabview.get()
@@ -396,75 +802,56 @@ class IconChangerApp(ctk.CTk):
             self.check_ready()
             self.btn_reset.configure(state="normal")
             
-            # Auto-suggest icon based on extension if in Files tab
-            if tab == "Files":
-                self.try_auto_select_icon(path)
+            # Auto-suggest an icon from the file name / extension or folder name
+            self.try_auto_select_icon(path, is_dir=(tab == "Folders"))
 
-    def try_auto_select_icon(self, path):
-        ext = Path(path).suffix.lower().lstrip(".")
-        if not ext:
+    def try_auto_select_icon(self, path, is_dir=False):
+        svg_path = self.resolver.resolve(path, is_dir=is_dir)
+        if svg_path is None:
             return
 
-        # Common mappings (extension -> icon name)
-        # Note: Many work directly (e.g. "json" -> "json.svg")
-        # but some need aliases.
-        mappings = {
-            "py": "python",
-            "js": "javascript",
-            "ts": "typescript",
-            "jsx": "react",
-            "tsx": "react_ts",
-            "md": "markdown",
-            "rb": "ruby",
-            "rs": "rust",
-            "go": "go",
-            "java": "java",
-            "c": "c",
-            "cpp": "cpp",
-            "h": "h",
-            "hpp": "hpp",
-            "cs": "csharp",
-            "html": "html",
-            "css": "css",
-            "scss": "sass",
-            "sh": "console",
-            "bat": "console",
-            "txt": "document",
-            "pdf": "pdf",
-            "zip": "zip",
-            "7z": "zip",
-            "tar": "zip",
-            "gz": "zip",
-            "xml": "xml",
-            "yaml": "yaml",
-            "yml": "yaml",
-            "dockerfile": "docker",
-            "vb": "visualstudio",
-            "sql": "database"
-        }
-
-        icon_name = mappings.get(ext, ext) # Default to extension name
-        
-        # Search in file icons
-        for svg_path in self.file_icons_all:
-            # Check exact match or standard name match
-            if svg_path.stem == icon_name:
-                self.select_icon(svg_path)
-                # Also scroll to or highlight? 
-                # For now just selecting it is enough for the logic.
-                # We update the search to show it? That might be nice.
-                self.search_var.set(icon_name) # This will trigger filter and show only this icon
-                return
+        self.select_icon(svg_path)
+        # Show it in the grid; this will trigger the filter
+        self.search_var.set(svg_path.stem)
 
     def select_icon(self, svg_path):
         self.selected_icon_path = svg_path
         self.status_label.configure(text=f"Selected Icon: {svg_path.stem}")
         self.check_ready()
 
+    def open_stats(self):
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.focus()
+            return
+        self.stats_window = StatsWindow(self)
+
+    def stats_lines(self):
+        lines = tracer.summary_lines()
+        cache = images.stats()
+        lines.append("")
+        lines.append(
+            f"image cache: {cache['entries']} entries, {cache['bytes'] / 2**20:.1f}/{cache['budget'] / 2**20:.0f} MB, "
+            f"{cache['hits']} hits / {cache['misses']} misses, {cache['evictions']} evicted"
+        )
+        lines.append(f"thumbnail loads pending: {self.scheduler.pending()}")
+        for name, index in (("folder", self.folder_search), ("file", self.file_search)):
+            s = index.latency_summary()
+            if s["count"]:
+                lines.append(f"{name} search: {s['count']} queries, {s['mean_ms']:.2f} ms avg, {s['p95_ms']:.2f} ms p95")
+        return lines
+
     def check_ready(self):
         if self.selected_target and self.selected_icon_path:
             self.btn_apply.configure(state="normal")
 
+    def on_color_change(self, choice):
+        # Recolored icons are only applied by path, not installed into the theme
+        if COLOR_VARIANTS[choice] is None:
+            self.themed_check.configure(state="normal")
+        else:
+            self.themed_var.set(False)
+            self.themed_check.configure(state="disabled")
+
     def apply_icon(self):
         self._apply_or_reset(reset=False)
 
@@ -482,38 +869,28 @@ class IconChangerApp(ctk.CTk):
         self.status_label.configure(text=f"{action}...")
 
         # Run in thread
-        threading.Thread(target=self._process_gio_thread, args=(reset,), daemon=True).start()
+        variant = COLOR_VARIANTS[self.color_var.get()]
+        threading.Thread(target=self._process_gio_thread, args=(reset, self.themed_var.get(), variant), daemon=True).start()
 
-    def _process_gio_thread(self, reset):
+    def _process_gio_thread(self, reset, themed=False, variant=None):
         try:
-            cmd = []
+            from icon_changer import core
+            from icon_changer.journal import Journal
+
+            if self.journal is None:
+                self.journal = Journal()
             if reset:
-                cmd = ["gio", "set", "-d", str(self.selected_target), "metadata::custom-icon"]
+                result = core.reset_icon(self.selected_target, journal=self.journal)
             else:
-                # Convert first
-                png_path = CONVERTED_DIR / f"{self.selected_icon_path.stem}.png"
-                if not png_path.exists():
-                    cairosvg.svg2png(url=str(self.selected_icon_path), write_to=str(png_path), output_width=256, output_height=256)
-                
-                cmd = [
-                    "gio", "set", "-t", "string",
-                    str(self.selected_target),
-                    "metadata::custom-icon",
-                    f"file://{png_path}"
-                ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                msg = "Icon reset successfully." if reset else "Icon applied successfully!"
-                # Force Nautilus refresh if possible (touch the file)
-                try:
-                    os.utime(self.selected_target, None)
-                except:
-                    pass
-            else:
-                msg = f"Error: {result.stderr}"
-            
+                # On HiDPI screens the file manager draws at a multiple of the
+                # nominal size, so pick a larger render rather than upscaling
+                size = int(CONVERTED_SIZE * self._get_window_scaling())
+                result = core.apply_icon(
+                    self.selected_target, self.selected_icon_path, self.converted_cache, size=size, themed=themed,
+                    variant=parse_variant(variant) if variant else None, journal=self.journal,
+                )
+
+            msg = result.message if result.ok else f"Error: {result.message}"
             self.after(0, lambda: self.status_label.configure(text=msg))
             
             # If reset, clear selection state visually
@@ -521,8 +898,42 @@ class IconChangerApp(ctk.CTk):
                 self.after(0, lambda: self.btn_apply.configure(state="disabled"))
 
         except Exception as e:
+            tracer.failure("apply", self.selected_target, e)
             self.after(0, lambda: self.status_label.configure(text=f"Error: {e}"))
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Change folder and file icons.")
+    parser.add_argument("--prewarm", action="store_true", help="Render every preview thumbnail into the cache and exit")
+    parser.add_argument("--workers", type=int, default=None, help="Number of render processes (default: CPU count)")
+    parser.add_argument(
+        "--startup-profile", nargs="?", const="-", default=None, metavar="FILE",
+        help="Report startup timings up to the first painted icon, then exit (to FILE as JSON, or stdout)",
+    )
+    parser.add_argument(
+        "--scroll-profile", nargs="?", const="-", default=None, metavar="FILE",
+        help="Scroll the folder grid top to bottom, then idle; report frame times and idle CPU as JSON and exit",
+    )
+    parser.add_argument("--icon-dir", action="append", default=[], metavar="DIR", help="Extra icon directory, taking precedence over the user and bundled icons (repeatable)")
+    parser.add_argument("--trace", default=None, metavar="FILE", help="Record timing spans and write them as a Chrome trace (JSON) on exit")
+    parser.add_argument("--image-cache-mb", type=float, default=None, metavar="MB", help="Memory budget for decoded thumbnails (default: 64)")
+    args = parser.parse_args(argv)
+    if args.startup_profile and args.scroll_profile:
+        parser.error("--startup-profile and --scroll-profile can't be combined")
+    return args
+
 if __name__ == "__main__":
-    app = IconChangerApp()
+    multiprocessing.freeze_support()
+    profile = StartupProfile(_APP_START)
+    profile.mark("imports done")
+    args = parse_args()
+    if args.prewarm:
+        from icon_changer.cli import run_prewarm
+        sys.exit(run_prewarm(args.workers))
+    if args.image_cache_mb is not None:
+        images.resize(int(args.image_cache_mb * 1024 * 1024))
+    if args.trace:
+        tracer.enable()
+    app = IconChangerApp(profile, args.startup_profile, args.icon_dir, args.scroll_profile)
     app.mainloop()
+    if args.trace:
+        tracer.write(args.trace)
@@ -0,0 +1 @@
+"""Headless building blocks shared by the Icon Changer GUI and its command-line modes."""
@@ -0,0 +1,288 @@
+# Common mappings (extension -> icon name)
+# Note: Many work directly (e.g. "json" -> "json.svg")
+# but some need aliases.
+EXTENSION_ALIASES = {
+    "py": "python",
+    "js": "javascript",
+    "ts": "typescript",
+    "jsx": "react",
+    "tsx": "react_ts",
+    "md": "markdown",
+    "rb": "ruby",
+    "rs": "rust",
+    "go": "go",
+    "java": "java",
+    "c": "c",
+    "cpp": "cpp",
+    "h": "h",
+    "hpp": "hpp",
+    "cs": "csharp",
+    "html": "html",
+    "css": "css",
+    "scss": "sass",
+    "sh": "console",
+    "bat": "console",
+    "txt": "document",
+    "pdf": "pdf",
+    "zip": "zip",
+    "7z": "zip",
+    "tar": "zip",
+    "gz": "zip",
+    "xml": "xml",
+    "yaml": "yaml",
+    "yml": "yaml",
+    "dockerfile": "docker",
+    "vb": "visualstudio",
+    "sql": "database",
+    "mjs": "javascript",
+    "cjs": "javascript",
+    "mts": "typescript",
+    "cts": "typescript",
+    "pyi": "python",
+    "pyw": "python",
+    "kt": "kotlin",
+    "kts": "kotlin",
+    "hs": "haskell",
+    "ex": "elixir",
+    "exs": "elixir",
+    "erl": "erlang",
+    "ml": "ocaml",
+    "pl": "perl",
+    "clj": "clojure",
+    "jl": "julia",
+    "cc": "cpp",
+    "cxx": "cpp",
+    "hh": "hpp",
+    "hxx": "hpp",
+    "mm": "objective-cpp",
+    "fs": "fsharp",
+    "fsx": "fsharp",
+    "cshtml": "razor",
+    "hx": "haxe",
+    "sol": "solidity",
+    "cu": "cuda",
+    "wasm": "webassembly",
+    "tf": "terraform",
+    "styl": "stylus",
+    "hbs": "handlebars",
+    "j2": "jinja",
+    "gql": "graphql",
+    "ps1": "powershell",
+    "zsh": "console",
+    "bash": "console",
+    "fish": "console",
+    "json5": "json",
+    "jsonc": "json",
+    "ipynb": "jupyter",
+    "bib": "bibliography",
+    "db": "database",
+    "sqlite": "database",
+    "png": "image",
+    "jpg": "image",
+    "jpeg": "image",
+    "gif": "image",
+    "webp": "image",
+    "bmp": "image",
+    "ico": "image",
+    "mp3": "audio",
+    "wav": "audio",
+    "flac": "audio",
+    "ogg": "audio",
+    "mp4": "video",
+    "mkv": "video",
+    "mov": "video",
+    "webm": "video",
+    "avi": "video",
+    "ttf": "font",
+    "otf": "font",
+    "woff": "font",
+    "woff2": "font",
+    "doc": "word",
+    "docx": "word",
+    "ppt": "powerpoint",
+    "pptx": "powerpoint",
+    "xls": "table",
+    "xlsx": "table",
+    "csv": "table",
+    "tsv": "table",
+    "rar": "zip",
+    "xz": "zip",
+    "bz2": "zip",
+    "class": "javaclass",
+    "pem": "certificate",
+    "crt": "certificate",
+    "cer": "certificate",
+    "pub": "key",
+    "patch": "diff",
+    "mk": "makefile",
+    "el": "lisp",
+    "scm": "scheme",
+    "rkt": "racket",
+    "psd": "adobe-photoshop",
+    "ai": "adobe-illustrator",
+    "blend": "blender",
+    "fig": "figma",
+    "srt": "subtitles",
+    "vtt": "subtitles",
+    "rest": "http",
+    # Compound extensions win over their last component
+    "d.ts": "typescript-def",
+    "d.mts": "typescript-def",
+    "test.ts": "test-ts",
+    "spec.ts": "test-ts",
+    "test.js": "test-js",
+    "spec.js": "test-js",
+    "test.jsx": "test-jsx",
+    "spec.jsx": "test-jsx",
+    "bench.ts": "bench-ts",
+    "bench.js": "bench-js",
+    "bench.jsx": "bench-jsx",
+    "js.map": "javascript-map",
+    "css.map": "css-map",
+    "stories.js": "storybook",
+    "stories.jsx": "storybook",
+    "stories.ts": "storybook",
+    "stories.tsx": "storybook",
+    "tar.gz": "zip",
+    "tar.xz": "zip",
+    "tar.bz2": "zip",
+}
+
+# Whole file names (lowercase) -> icon name; checked before extensions
+FILENAME_ALIASES = {
+    "dockerfile": "docker",
+    "containerfile": "docker",
+    ".dockerignore": "docker",
+    "docker-compose.yml": "docker",
+    "docker-compose.yaml": "docker",
+    "compose.yml": "docker",
+    "compose.yaml": "docker",
+    "package.json": "nodejs",
+    ".nvmrc": "nodejs",
+    "package-lock.json": "npm",
+    ".npmrc": "npm",
+    "yarn.lock": "yarn",
+    ".yarnrc": "yarn",
+    ".yarnrc.yml": "yarn",
+    "pnpm-lock.yaml": "pnpm",
+    "pnpm-workspace.yaml": "pnpm",
+    "bun.lockb": "bun",
+    "bun.lock": "bun",
+    ".gitignore": "git",
+    ".gitattributes": "git",
+    ".gitmodules": "git",
+    ".gitkeep": "git",
+    ".gitlab-ci.yml": "gitlab",
+    "makefile": "makefile",
+    "gnumakefile": "makefile",
+    "cmakelists.txt": "cmake",
+    "readme": "readme",
+    "readme.md": "readme",
+    "readme.txt": "readme",
+    "readme.rst": "readme",
+    "license": "license",
+    "license.md": "license",
+    "license.txt": "license",
+    "copying": "license",
+    "unlicense": "unlicense",
+    "changelog": "changelog",
+    "changelog.md": "changelog",
+    "contributing.md": "contributing",
+    "code_of_conduct.md": "conduct",
+    "authors": "authors",
+    "authors.md": "authors",
+    "codeowners": "codeowners",
+    "todo": "todo",
+    "todo.md": "todo",
+    "cargo.toml": "rust",
+    "cargo.lock": "lock",
+    "go.mod": "go-mod",
+    "go.sum": "go-mod",
+    "gemfile": "gemfile",
+    "gemfile.lock": "gemfile",
+    "requirements.txt": "python-misc",
+    "pyproject.toml": "python-misc",
+    "setup.py": "python-misc",
+    "setup.cfg": "python-misc",
+    "pipfile": "python-misc",
+    "poetry.lock": "poetry",
+    "uv.lock": "uv",
+    "ruff.toml": "ruff",
+    ".ruff.toml": "ruff",
+    ".pre-commit-config.yaml": "pre-commit",
+    "tsconfig.json": "tsconfig",
+    "jsconfig.json": "jsconfig",
+    ".editorconfig": "editorconfig",
+    ".prettierrc": "prettier",
+    ".prettierrc.json": "prettier",
+    ".eslintrc": "eslint",
+    ".eslintrc.js": "eslint",
+    ".eslintrc.json": "eslint",
+    "eslint.config.js": "eslint",
+    ".babelrc": "babel",
+    "babel.config.js": "babel",
+    "webpack.config.js": "webpack",
+    "vite.config.js": "vite",
+    "vite.config.ts": "vite",
+    "vitest.config.ts": "vitest",
+    "jest.config.js": "jest",
+    "jest.config.ts": "jest",
+    "rollup.config.js": "rollup",
+    "tailwind.config.js": "tailwindcss",
+    "tailwind.config.ts": "tailwindcss",
+    "biome.json": "biome",
+    "deno.json": "deno",
+    "nx.json": "nx",
+    "turbo.json": "turborepo",
+    "lerna.json": "lerna",
+    "firebase.json": "firebase",
+    "netlify.toml": "netlify",
+    "vercel.json": "vercel",
+    "renovate.json": "renovate",
+    ".travis.yml": "travis",
+    "azure-pipelines.yml": "azure-pipelines",
+    "jenkinsfile": "jenkins",
+    "vagrantfile": "vagrant",
+    "procfile": "heroku",
+    "justfile": "just",
+    "taskfile.yml": "taskfile",
+    "nginx.conf": "nginx",
+    "robots.txt": "robots",
+    "favicon.ico": "favicon",
+    "hosts": "hosts",
+}
+
+# Directory names (lowercase) -> folder icon name (without "folder-")
+FOLDER_ALIASES = {
+    "__tests__": "test",
+    "spec": "test",
+    "specs": "test",
+    "source": "src",
+    "sources": "src",
+    "documentation": "docs",
+    "doc": "docs",
+    "img": "images",
+    "imgs": "images",
+    "pictures": "images",
+    "library": "lib",
+    "libs": "lib",
+    "util": "utils",
+    "utilities": "utils",
+    "bin": "scripts",
+    "node_modules": "node",
+    "build": "dist",
+    "out": "dist",
+    "tmp": "temp",
+    "example": "examples",
+    "workflows": "gh-workflows",
+    "migration": "migrations",
+}
+
+
+def icon_aliases(mappings=EXTENSION_ALIASES):
+    """ Invert an extension -> icon mapping into icon -> [search terms]. """
+    aliases = {}
+    for ext, icon_name in mappings.items():
+        if ext != icon_name:
+            aliases.setdefault(icon_name, []).append(ext)
+    return aliases
@@ -0,0 +1,136 @@
+import json
+import mmap
+import os
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+ATLAS_NAME = "previews.atlas"
+INDEX_SUFFIX = ".json"
+ATLAS_VERSION = 1
+
+
+class Atlas:
+    """
+    Read side of the thumbnail atlas: one file of packed raw RGBA tiles, all the
+    same size, plus a JSON index of cache key -> tile slot. The data file is
+    mmap'ed once and tiles are handed out as PIL images that share its memory,
+    so showing a cached icon needs no file open and no PNG decode.
+    """
+
+    def __init__(self, path, tile_size, slots, mm):
+        self.path = Path(path)
+        self.tile_size = tile_size
+        self.tile_bytes = tile_size * tile_size * 4
+        self._slots = slots
+        self._mm = mm
+        self._view = memoryview(mm) if mm is not None else None
+
+    @classmethod
+    def open(cls, path):
+        """ Open an atlas, or return an empty one if it is missing or unreadable. """
+        path = Path(path)
+        try:
+            with open(f"{path}{INDEX_SUFFIX}", "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != ATLAS_VERSION:
+                raise ValueError("unsupported atlas version")
+            tile_size = index["tile_size"]
+            slots = index["slots"]
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if slots else None
+            if mm is not None and len(mm) < len(slots) * tile_size * tile_size * 4:
+                raise ValueError("truncated atlas")
+            return cls(path, tile_size, slots, mm)
+        except (OSError, ValueError, KeyError):
+            return cls(path, 0, {}, None)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def __len__(self):
+        return len(self._slots)
+
+    def keys(self):
+        return self._slots.keys()
+
+    def tile_bytes_for(self, key):
+        """ Zero-copy memoryview of the raw RGBA bytes of one tile. """
+        offset = self._slots[key] * self.tile_bytes
+        return self._view[offset:offset + self.tile_bytes]
+
+    def get(self, key):
+        """ PIL image backed directly by the mapped tile, or None if key isn't packed. """
+        if key not in self._slots:
+            return None
+        size = (self.tile_size, self.tile_size)
+        return Image.frombuffer("RGBA", size, self.tile_bytes_for(key), "raw", "RGBA", 0, 1)
+
+
+def write_atlas(path, tile_size, tiles):
+    """
+    Write (key, rgba_bytes) pairs as a new atlas at path. The data file and its
+    index are written to temp files and renamed into place, so readers holding
+    the previous mapping keep working.
+    """
+    path = Path(path)
+    tile_bytes = tile_size * tile_size * 4
+    tmp_data = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_index = path.with_name(f".{path.name}{INDEX_SUFFIX}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    slots = {}
+    with open(tmp_data, "wb") as f:
+        for key, data in tiles:
+            if key in slots or len(data) != tile_bytes:
+                continue
+            slots[key] = len(slots)
+            f.write(data)
+    with open(tmp_index, "w", encoding="utf-8") as f:
+        json.dump({"version": ATLAS_VERSION, "tile_size": tile_size, "slots": slots}, f, separators=(",", ":"))
+
+    # Data first: an index never points past the end of its data file.
+    os.replace(tmp_data, path)
+    os.replace(tmp_index, f"{path}{INDEX_SUFFIX}")
+    return len(slots)
+
+
+def decode_tile(png_path, tile_size):
+    with Image.open(png_path) as img:
+        img = img.convert("RGBA")
+        if img.size != (tile_size, tile_size):
+            img = img.resize((tile_size, tile_size), Image.LANCZOS)
+        return img.tobytes()
+
+
+def update_atlas(path, cache, svg_paths, tile_size):
+    """
+    Repack the atlas at path so it holds a tile for every rendered SVG in
+    svg_paths. Tiles already in the old atlas are copied as raw bytes; only
+    newly rendered previews are decoded. Entries for SVGs that are gone are
+    dropped. Returns the opened, up-to-date Atlas.
+    """
+    old = Atlas.open(path)
+    if old.tile_size != tile_size:
+        old = Atlas(path, tile_size, {}, None)
+
+    def tiles():
+        for svg_path in svg_paths:
+            key = cache.key(svg_path, tile_size)
+            if key in old:
+                yield key, old.tile_bytes_for(key)
+                continue
+            png_path = cache.lookup(svg_path, tile_size)
+            if png_path is None:
+                continue
+            try:
+                yield key, decode_tile(png_path, tile_size)
+            except OSError:
+                cache.discard(svg_path, tile_size)
+
+    keys = [cache.key(p, tile_size) for p in svg_paths]
+    if set(keys) <= set(old.keys()) and len(old) == len(set(keys)):
+        return old
+
+    write_atlas(path, tile_size, tiles())
+    return Atlas.open(path)
@@ -0,0 +1,285 @@
+"""
+Headless benchmarks for the hot paths: thumbnail rendering (cold and warm),
+cache lookups, recoloring, search, name -> icon resolution and bulk apply. Everything
+runs against the bundled icons in a throwaway cache directory (rasterizer
+choice included, so results don't depend on a saved one), so the user's
+caches are not touched and no display is needed:
+
+    python -m icon_changer bench --output bench.json
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .aliases import EXTENSION_ALIASES, FILENAME_ALIASES, FOLDER_ALIASES, icon_aliases
+from .atlas import ATLAS_NAME, Atlas
+from .cache import RenderCache
+from .config import ICON_DIR, PREVIEW_SIZE
+from .core import apply_many
+from .metadata import CliBackend, FakeBackend
+from .rasterizers import use_choice_path
+from .recolor import parse_variant, recolor_many
+from .render import prewarm
+from .resolver import IconResolver
+from .search import IconSearchIndex
+
+BENCH_VERSION = 1
+
+# Typical color-coding variants
+RECOLOR_VARIANTS = ("tint:#e53935", "tint:#43a047", "hue:200", "map:#90a4ae=#fb8c00")
+
+# Typed one character at a time, like a user filling in the search box
+SEARCH_QUERIES = ("python", "folder-src", "json", "react", "docker", "typescript", "zzz", "tst", "md", "gi")
+
+
+def summarize(samples_ms):
+    """ count / mean / median / p95 / min / max of a list of milliseconds. """
+    samples = sorted(samples_ms)
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples),
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_ms": samples[0],
+        "max_ms": samples[-1],
+    }
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def bench_render(icon_dir, preview_dir, workers):
+    """ Cold prewarm into an empty cache, then the same again fully cached. """
+    results = {}
+    for label in ("cold", "warm"):
+        stats = prewarm(icon_dir, preview_dir, workers=workers)
+        stats["failed"] = len(stats["failed"])
+        results[label] = stats
+    return results
+
+
+def bench_thumbnails(svg_paths, preview_dir):
+    """ The GUI's thumbnail load: atlas tile, else cache lookup + PNG decode. """
+    from PIL import Image
+
+    cache = RenderCache(preview_dir).load()
+    atlas = Atlas.open(preview_dir / ATLAS_NAME)
+
+    decode_ms = []
+    for svg_path in svg_paths:
+        png_path = cache.lookup(svg_path, PREVIEW_SIZE)
+        if png_path is None:
+            continue
+        start = time.perf_counter()
+        with Image.open(png_path) as image:
+            image.load()
+        decode_ms.append((time.perf_counter() - start) * 1000)
+
+    atlas_ms = []
+    for svg_path in svg_paths:
+        start = time.perf_counter()
+        image = atlas.get(cache.key(svg_path, PREVIEW_SIZE))
+        if image is not None:
+            atlas_ms.append((time.perf_counter() - start) * 1000)
+
+    return {"png_decode": summarize(decode_ms), "atlas": summarize(atlas_ms)}
+
+
+def bench_cache(svg_paths, preview_dir, rounds=20):
+    cache = RenderCache(preview_dir)
+    _, load_ms = _timed(cache.load)
+    _, refresh_ms = _timed(cache.refresh_sources, svg_paths)
+
+    start = time.perf_counter()
+    hits = 0
+    for _ in range(rounds):
+        for svg_path in svg_paths:
+            hits += cache.lookup(svg_path, PREVIEW_SIZE) is not None
+    elapsed = time.perf_counter() - start
+    lookups = rounds * len(svg_paths)
+    return {
+        "manifest_load_ms": load_ms,
+        "refresh_sources_ms": refresh_ms,
+        "lookups": lookups,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "lookup_us": elapsed / lookups * 1e6 if lookups else 0.0,
+    }
+
+
+def bench_recolor(svg_paths, preview_dir, work_dir, limit=100):
+    """ Variants of cached previews, cold (decode + recolor + encode) then cached. """
+    cache = RenderCache(preview_dir).load()
+    pngs = [p for p in (cache.lookup(s, PREVIEW_SIZE) for s in svg_paths[:limit]) if p is not None]
+    variants = [parse_variant(spec) for spec in RECOLOR_VARIANTS]
+    jobs = [(png, variant) for png in pngs for variant in variants]
+    results = {"variants": len(jobs)}
+    for label in ("cold", "warm"):
+        out, ms = _timed(recolor_many, jobs, work_dir / "variants")
+        results[label] = {
+            "total_ms": ms,
+            "per_variant_ms": ms / len(jobs) if jobs else 0.0,
+            "failed": sum(1 for _, error in out if error),
+        }
+    return results
+
+
+def bench_search(svg_paths):
+    folders = [p for p in svg_paths if p.stem.startswith("folder")]
+    files = [p for p in svg_paths if not p.stem.startswith("folder")]
+    index, build_ms = _timed(IconSearchIndex, files, icon_aliases(EXTENSION_ALIASES))
+    IconSearchIndex(folders)
+
+    typed_ms, fresh_ms = [], []
+    for query in SEARCH_QUERIES:
+        # Incremental typing narrows from the previous result set...
+        index.search("")
+        for n in range(1, len(query) + 1):
+            _, ms = _timed(index.search, query[:n])
+            typed_ms.append(ms)
+        # ...while a pasted query starts from the n-gram index
+        index.search("")
+        _, ms = _timed(index.search, query)
+        fresh_ms.append(ms)
+    _, all_ms = _timed(index.search, "")
+
+    return {
+        "icons": len(files),
+        "build_ms": build_ms,
+        "typed": summarize(typed_ms),
+        "fresh": summarize(fresh_ms),
+        "empty_query_ms": all_ms,
+    }
+
+
+def _sample_names():
+    names = [(f"file.{ext}", False) for ext in EXTENSION_ALIASES]
+    names += [(name, False) for name in FILENAME_ALIASES]
+    names += [(name, True) for name in FOLDER_ALIASES]
+    names += [(f"unknown{i}.nothing", False) for i in range(50)]
+    return names
+
+
+def bench_resolve(svg_paths, repeat=50):
+    resolver, build_ms = _timed(IconResolver, svg_paths)
+    names = _sample_names()
+
+    start = time.perf_counter()
+    matched = sum(resolver.resolve_name(n, d) is not None for n, d in names)
+    cold = time.perf_counter() - start
+
+    # Repeats hit the memo, like the same names recurring across a tree
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name, is_dir in names:
+            resolver.resolve_name(name, is_dir)
+    warm = time.perf_counter() - start
+
+    return {
+        "build_ms": build_ms,
+        "names": len(names),
+        "matched": matched,
+        "cold_us": cold / len(names) * 1e6,
+        "memoized_us": warm / (repeat * len(names)) * 1e6,
+    }
+
+
+def bench_apply(icon_dir, work_dir, targets, delay):
+    """
+    apply_many over `targets` directories with two stand-ins for gio: a
+    FakeBackend sleeping `delay` per write (pipeline overhead), and the gio
+    CLI backend calling a no-op `gio` script (real process spawn cost),
+    serially and with 8 calls in flight.
+    """
+    target_dir = work_dir / "targets"
+    icons = ["python", "json", "folder-src", "markdown", "docker"]
+    pairs = []
+    for i in range(targets):
+        target = target_dir / f"t{i}"
+        target.mkdir(parents=True, exist_ok=True)
+        pairs.append((str(target), icons[i % len(icons)]))
+
+    stub_gio = work_dir / "gio"
+    stub_gio.write_text("#!/bin/sh\nexit 0\n")
+    stub_gio.chmod(0o755)
+
+    cache = RenderCache(work_dir / "converted").load()
+    # Convert up front so every run below measures only the metadata writes
+    apply_many(pairs[:len(icons)], icon_dir=icon_dir, cache=cache, backend=FakeBackend())
+
+    results = {"write_delay_ms": delay * 1000}
+    for label, backend in (
+        ("fake", FakeBackend(delay=delay)),
+        ("cli_serial", CliBackend(1, gio=str(stub_gio))),
+        ("cli_parallel", CliBackend(8, gio=str(stub_gio))),
+    ):
+        out, ms = _timed(apply_many, pairs, icon_dir=icon_dir, cache=cache, backend=backend)
+        results[label] = {
+            "targets": len(pairs),
+            "ok": sum(r.ok for r in out),
+            "ms": ms,
+            "targets_per_second": len(pairs) / (ms / 1000) if ms else 0.0,
+        }
+    return results
+
+
+def run(icon_dir=ICON_DIR, limit=None, workers=None, targets=500, delay=0.002, progress=None):
+    """ Run every benchmark and return the results as a JSON-ready dict. """
+    svg_paths = sorted(Path(icon_dir).glob("*.svg"))
+    if limit:
+        svg_paths = svg_paths[:limit]
+
+    report = {
+        "version": BENCH_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "icons": len(svg_paths),
+        "results": {},
+    }
+    results = report["results"]
+
+    with tempfile.TemporaryDirectory(prefix="icon-changer-bench-") as tmp, \
+            use_choice_path(Path(tmp) / "rasterizer.json"):
+        work_dir = Path(tmp)
+        # prewarm() reads a whole directory, so a --limit subset gets its own
+        subset_dir = work_dir / "icons"
+        subset_dir.mkdir()
+        for svg_path in svg_paths:
+            (subset_dir / svg_path.name).symlink_to(svg_path.resolve())
+        svg_paths = sorted(subset_dir.glob("*.svg"))
+        preview_dir = work_dir / "previews"
+
+        def step(name, fn, *args):
+            if progress:
+                progress(name)
+            results[name] = fn(*args)
+
+        step("render", bench_render, subset_dir, preview_dir, workers)
+        step("thumbnails", bench_thumbnails, svg_paths, preview_dir)
+        step("cache", bench_cache, svg_paths, preview_dir)
+        step("recolor", bench_recolor, svg_paths, preview_dir, work_dir)
+        step("search", bench_search, svg_paths)
+        step("resolve", bench_resolve, svg_paths)
+        step("apply", bench_apply, icon_dir, work_dir, targets, delay)
+
+    return report
+
+
+def write_report(report, destination):
+    """ Write the report as JSON to a path, or to stdout for "-". """
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if destination == "-":
+        print(text)
+    else:
+        Path(destination).write_text(text + "\n", encoding="utf-8")
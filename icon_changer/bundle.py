@@ -0,0 +1,146 @@
+"""
+Assets precomputed at build time and shipped next to the bundled icons, so a
+fresh install can show the full grid without listing, hashing or rasterizing
+anything:
+
+    prebuilt/catalog.json     every bundled icon: tab, content digest and
+                              byte size
+    prebuilt/previews.atlas   every preview thumbnail, packed (see atlas.py)
+
+build.py calls build_bundle(); the app reads it with Bundle.load().
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .atlas import ATLAS_NAME, Atlas, decode_tile, write_atlas
+from .cache import RenderCache, content_digest
+from .config import ICON_DIR, PREBUILT_DIR, PREVIEW_SIZE
+from .render import RenderEngine, preview_jobs
+
+BUNDLE_INDEX = "catalog.json"
+BUNDLE_VERSION = 1
+
+
+def build_bundle(icon_dir, out_dir, size=PREVIEW_SIZE, workers=None, progress=None):
+    """
+    Render every SVG in icon_dir at size and write the catalog and packed
+    atlas into out_dir. Returns a stats dict.
+    """
+    start = time.perf_counter()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    svg_paths = sorted(Path(icon_dir).glob("*.svg"))
+
+    icons = {}
+    for svg_path in svg_paths:
+        icons[svg_path.name] = {
+            "kind": "folder" if svg_path.name.startswith("folder-") else "file",
+            "digest": content_digest(svg_path),
+            "bytes": svg_path.stat().st_size,
+        }
+
+    failed = []
+    with tempfile.TemporaryDirectory(prefix="icon-changer-bundle-") as tmp:
+        cache = RenderCache(tmp).load()
+        jobs = preview_jobs(svg_paths, cache, size)
+        engine = RenderEngine(workers)
+        try:
+            for done, (svg_path, error) in enumerate(engine.render_many(jobs), 1):
+                if error:
+                    failed.append((svg_path, error))
+                else:
+                    cache.record(Path(svg_path), size)
+                if progress:
+                    progress(done, len(jobs))
+        finally:
+            engine.shutdown()
+
+        def tiles():
+            for svg_path in svg_paths:
+                png_path = cache.lookup(svg_path, size)
+                if png_path is not None:
+                    yield f"{icons[svg_path.name]['digest']}-{size}", decode_tile(png_path, size)
+
+        write_atlas(out_dir / ATLAS_NAME, size, tiles())
+
+    index = {
+        "version": BUNDLE_VERSION,
+        "tile_size": size,
+        "icons": icons,
+    }
+    tmp_path = out_dir / f".{BUNDLE_INDEX}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp_path, out_dir / BUNDLE_INDEX)
+
+    return {
+        "icons": len(svg_paths),
+        "rendered": len(jobs) - len(failed),
+        "failed": failed,
+        "atlas_tiles": len(Atlas.open(out_dir / ATLAS_NAME)),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+class Bundle:
+    """ The prebuilt assets, or an empty stand-in when running from a source checkout. """
+
+    def __init__(self, icons=None, atlas=None, tile_size=PREVIEW_SIZE):
+        self.icons = icons or {}  # file name -> {"kind", "digest", "bytes"}
+        self.atlas = atlas or Atlas(PREBUILT_DIR / ATLAS_NAME, 0, {}, None)
+        self.tile_size = tile_size
+
+    @classmethod
+    def load(cls, prebuilt_dir=PREBUILT_DIR):
+        prebuilt_dir = Path(prebuilt_dir)
+        try:
+            with open(prebuilt_dir / BUNDLE_INDEX, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != BUNDLE_VERSION:
+                return cls()
+            return cls(index["icons"], Atlas.open(prebuilt_dir / ATLAS_NAME), index["tile_size"])
+        except (OSError, ValueError, KeyError):
+            return cls()
+
+    def __len__(self):
+        return len(self.icons)
+
+    def fixed_dirs(self):
+        """
+        {ICON_DIR: listing} for Catalog(fixed=...) when running from a
+        PyInstaller build, else None. There ICON_DIR is a fresh extraction
+        whose path and mtimes change every launch but whose contents are
+        exactly what the bundle lists.
+        """
+        if not getattr(sys, "frozen", False) or not self.icons:
+            return None
+        return {ICON_DIR: {name: [0, entry["bytes"]] for name, entry in self.icons.items()}}
+
+    def svg_paths(self, icon_dir=ICON_DIR):
+        """ The bundled icons' paths, sorted by name, without listing icon_dir. """
+        icon_dir = Path(icon_dir)
+        return [icon_dir / name for name in sorted(self.icons)]
+
+    def seed(self, cache, svg_paths):
+        """
+        Give cache the build-time digest of every bundled SVG that still has
+        its build-time size, so none of them is hashed on this machine.
+        Returns the number seeded.
+        """
+        seeded = 0
+        for svg_path in svg_paths:
+            entry = self.icons.get(svg_path.name)
+            if entry is None or Path(svg_path).parent != ICON_DIR:
+                continue
+            try:
+                st = os.stat(svg_path)
+            except OSError:
+                continue
+            if st.st_size == entry["bytes"]:
+                cache.seed(svg_path, entry["digest"], st)
+                seeded += 1
+        return seeded
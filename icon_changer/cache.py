@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from .trace import tracer
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# Unrecorded PNGs younger than this may belong to a render still in flight.
+STRAY_GRACE_SECONDS = 3600
+
+
+def content_digest(svg_path):
+    with open(svg_path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=10).hexdigest()
+
+
+class RenderCache:
+    """
+    Content-addressed store of rendered PNGs.
+
+    Files are named after the SVG content hash and output size, so editing an
+    SVG produces a new key and the stale raster is never served. A single
+    manifest records which keys exist and which source files map to which
+    hash; it is read once at startup instead of stat'ing every PNG.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.manifest_path = self.root / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._sources = {}  # str(svg_path) -> [mtime_ns, size, digest]
+        self._entries = {}  # "digest-size" -> {"stem": ..., "used": ...}
+        self._dirty = False
+        self._loaded = False
+        # Counter names, e.g. cache.previews.hit
+        self._hit = f"cache.{self.root.name}.hit"
+        self._miss = f"cache.{self.root.name}.miss"
+
+    def load(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self._sources = data.get("sources", {})
+                self._entries = data.get("entries", {})
+        except (OSError, ValueError):
+            # Missing or corrupt manifest: start empty, files get re-rendered.
+            self._sources = {}
+            self._entries = {}
+        self._loaded = True
+        return self
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": MANIFEST_VERSION, "sources": dict(self._sources), "entries": dict(self._entries)}
+            self._dirty = False
+        tmp_path = self.manifest_path.with_name(f".{MANIFEST_NAME}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.manifest_path)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def digest(self, svg_path):
+        """ Content hash of svg_path, re-hashing only if its mtime or size changed. """
+        self._ensure_loaded()
+        key = str(svg_path)
+        st = os.stat(svg_path)
+        with self._lock:
+            known = self._sources.get(key)
+        if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+            return known[2]
+        digest = content_digest(svg_path)
+        with self._lock:
+            self._sources[key] = [st.st_mtime_ns, st.st_size, digest]
+            self._dirty = True
+        return digest
+
+    def seed(self, svg_path, digest, st):
+        """ Record a digest known from elsewhere (the prebuilt bundle) for svg_path as of stat st. """
+        self._ensure_loaded()
+        source = [st.st_mtime_ns, st.st_size, digest]
+        with self._lock:
+            if self._sources.get(str(svg_path)) != source:
+                self._sources[str(svg_path)] = source
+                self._dirty = True
+
+    def _known_digest(self, svg_path):
+        # Sources validated by refresh_sources() are trusted without a stat.
+        with self._lock:
+            known = self._sources.get(str(svg_path))
+        return known[2] if known else self.digest(svg_path)
+
+    def refresh_sources(self, svg_paths):
+        """
+        Validate the recorded hash of every current SVG and forget sources that
+        no longer exist, so their renders become orphans. Returns the number of
+        SVGs whose content changed since the last run.
+        """
+        self._ensure_loaded()
+        live = set()
+        changed = 0
+        for svg_path in svg_paths:
+            key = str(svg_path)
+            live.add(key)
+            with self._lock:
+                before = self._sources.get(key)
+            try:
+                digest = self.digest(svg_path)
+            except OSError:
+                continue
+            if before and before[2] != digest:
+                changed += 1
+        with self._lock:
+            for key in [k for k in self._sources if k not in live]:
+                del self._sources[key]
+                self._dirty = True
+        return changed
+
+    def forget_sources(self, svg_paths):
+        """ Forget the given sources only (e.g. deleted SVGs), leaving every other record alone. """
+        self._ensure_loaded()
+        with self._lock:
+            for svg_path in svg_paths:
+                if self._sources.pop(str(svg_path), None) is not None:
+                    self._dirty = True
+
+    def key(self, svg_path, size):
+        """ Cache key of svg_path at size; also used to index the preview atlas. """
+        return f"{self._known_digest(svg_path)}-{size}"
+
+    def path_for(self, svg_path, size):
+        return self.root / f"{self.key(svg_path, size)}.png"
+
+    def lookup(self, svg_path, size, check=False):
+        """
+        Return the cached PNG path for svg_path at size, or None if not rendered
+        yet. With check, the PNG is also stat'ed and a render deleted behind
+        the manifest's back is forgotten; for paths handed out to other
+        programs (applied icons), not for the previews of every grid scroll.
+        """
+        self._ensure_loaded()
+        key = f"{self._known_digest(svg_path)}-{size}"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["used"] = int(time.time())
+        if entry is not None and check and not (self.root / f"{key}.png").is_file():
+            tracer.count(f"cache.{self.root.name}.lost")
+            self.discard(svg_path, size)
+            entry = None
+        tracer.count(self._miss if entry is None else self._hit)
+        return None if entry is None else self.root / f"{key}.png"
+
+    def record(self, svg_path, size):
+        """ Mark svg_path at size as rendered into path_for(svg_path, size). """
+        key = f"{self._known_digest(svg_path)}-{size}"
+        with self._lock:
+            self._entries[key] = {"stem": Path(svg_path).stem, "used": int(time.time())}
+            self._dirty = True
+
+    def discard(self, svg_path, size):
+        key = f"{self._known_digest(svg_path)}-{size}"
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._dirty = True
+
+    def evict_orphans(self, limit=None):
+        """
+        Delete renders whose SVG content is no longer referenced by any source,
+        plus stray PNGs the manifest doesn't know about (e.g. the old stem-keyed
+        layout). At most `limit` files are removed per call so the work can be
+        spread across launches. Returns the number of files removed.
+        Only for caches nothing outside the app refers to (previews): applied
+        icons point into the converted cache by path, old layout included.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            live_digests = {s[2] for s in self._sources.values()}
+            orphans = [k for k in self._entries if k.rsplit("-", 1)[0] not in live_digests]
+            known_files = {f"{k}.png" for k in self._entries}
+
+        removed = 0
+        for key in orphans:
+            if limit is not None and removed >= limit:
+                break
+            try:
+                (self.root / f"{key}.png").unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            with self._lock:
+                self._entries.pop(key, None)
+                self._dirty = True
+            removed += 1
+
+        if limit is None or removed < limit:
+            cutoff = time.time() - STRAY_GRACE_SECONDS
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if limit is not None and removed >= limit:
+                        break
+                    if not entry.name.endswith(".png") or entry.name in known_files:
+                        continue
+                    try:
+                        if entry.stat().st_mtime < cutoff:
+                            os.unlink(entry.path)
+                            removed += 1
+                    except OSError:
+                        pass
+        return removed
@@ -0,0 +1,270 @@
+"""
+The icon catalog: every SVG from several icon directories merged into one
+name -> path view. Directories earlier in the list win, so a user pack can
+override a bundled icon of the same name. The per-file stat snapshot is
+persisted, so a later run (or a watcher) only has to diff against it to know
+which icons were added, removed or changed. Directories whose listing is
+known up front (the bundled icons of a onefile build, extracted to a new
+temp directory on every launch) are passed as `fixed` instead: they are
+never scanned, and left out of the snapshot, which is keyed by path.
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+from .config import CATALOG_PATH, ICON_DIR, USER_ICON_DIR
+from .trace import tracer
+
+CATALOG_VERSION = 1
+
+# Lists of SVG paths (in the merged view) that differ from the last refresh.
+# dropped: every path that left the view, i.e. removed ones plus those of names
+# now served from another directory (an override added or deleted)
+CatalogChange = namedtuple("CatalogChange", "added removed changed dropped")
+
+
+def icon_dirs(extra=()):
+    """ Icon directories in precedence order: extra ones, the user's, then the bundled set. """
+    dirs = [Path(d).expanduser() for d in extra] + [USER_ICON_DIR, ICON_DIR]
+    return list(dict.fromkeys(dirs))
+
+
+def scan_dir(directory):
+    """ {file name: [mtime_ns, size]} for the SVGs directly in directory. """
+    files = {}
+    try:
+        it = os.scandir(directory)
+    except OSError:
+        return files
+    with it:
+        for entry in it:
+            if not entry.name.endswith(".svg"):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            files[entry.name] = [st.st_mtime_ns, st.st_size]
+    return files
+
+
+class Catalog:
+    def __init__(self, dirs, index_path=CATALOG_PATH, fixed=None):
+        self.dirs = [Path(d) for d in dirs]
+        self.index_path = Path(index_path)
+        self.fixed = {str(Path(d)): files for d, files in (fixed or {}).items()}  # str(dir) -> {name: stat}
+        self._files = {}  # str(dir) -> {name: [mtime_ns, size]}
+        self._merged = {}  # stem -> (Path, [mtime_ns, size])
+        self._lock = threading.Lock()
+
+    def load(self):
+        """ Read the persisted snapshot; the merged view is usable straight away. """
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CATALOG_VERSION:
+                self._files = {d: data["files"][d] for d in map(str, self.dirs) if d in data["files"]}
+        except (OSError, ValueError, KeyError, AttributeError):
+            self._files = {}
+        self._files.update((d, files) for d, files in self.fixed.items() if d in map(str, self.dirs))
+        with self._lock:
+            self._merged = self._merge(self._files)
+        return self
+
+    def save(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        with self._lock:
+            files = {d: f for d, f in self._files.items() if d not in self.fixed}
+            data = {"version": CATALOG_VERSION, "files": files}
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+
+    def _merge(self, files):
+        merged = {}
+        for directory in self.dirs:
+            for name, stat in files.get(str(directory), {}).items():
+                merged.setdefault(name[:-len(".svg")], (directory / name, stat))
+        return merged
+
+    def refresh(self):
+        """
+        Re-stat every directory and diff against the snapshot. Returns a
+        CatalogChange, or None if nothing changed (the snapshot is saved
+        only then).
+        """
+        with tracer.span("catalog.refresh"):
+            files = {str(d): self.fixed[str(d)] if str(d) in self.fixed else scan_dir(d) for d in self.dirs}
+            merged = self._merge(files)
+            with self._lock:
+                old = self._merged
+                added = [merged[s][0] for s in merged.keys() - old.keys()]
+                removed = [old[s][0] for s in old.keys() - merged.keys()]
+                changed = [merged[s][0] for s in merged.keys() & old.keys() if merged[s] != old[s]]
+                moved = [old[s][0] for s in merged.keys() & old.keys() if merged[s][0] != old[s][0]]
+                self._files = files
+                self._merged = merged
+        if not (added or removed or changed):
+            return None
+        tracer.count("catalog.changes", len(added) + len(removed) + len(changed))
+        try:
+            self.save()
+        except OSError as e:
+            tracer.failure("catalog", self.index_path, e)
+        return CatalogChange(sorted(added), sorted(removed), sorted(changed), sorted(removed + moved))
+
+    def paths(self):
+        """ Winning SVG path of every icon, sorted by file name. """
+        with self._lock:
+            return sorted((path for path, _ in self._merged.values()), key=lambda p: p.name)
+
+    def get(self, name):
+        """ SVG path of an icon name, or None. """
+        with self._lock:
+            entry = self._merged.get(name)
+        return entry[0] if entry else None
+
+    def __len__(self):
+        return len(self._merged)
+
+
+_default_catalog = None
+_default_extra_dirs = ()
+
+
+def set_default_dirs(extra_dirs):
+    """ Extra directories for default_catalog(), which is still only built on first use. """
+    global _default_extra_dirs
+    _default_extra_dirs = tuple(extra_dirs or ())
+
+
+def default_catalog(extra_dirs=None):
+    """
+    The process-wide catalog over icon_dirs(extra_dirs), loaded and refreshed
+    on first use. The first call decides the extra directories (by default
+    those given to set_default_dirs()).
+    """
+    global _default_catalog
+    if _default_catalog is None:
+        from .bundle import Bundle
+        dirs = icon_dirs(extra_dirs if extra_dirs is not None else _default_extra_dirs)
+        _default_catalog = Catalog(dirs, fixed=Bundle.load().fixed_dirs())
+        _default_catalog.load().refresh()
+    return _default_catalog
+
+
+# inotify(7) flags: anything that can add, drop or rewrite an SVG
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+
+class Inotify:
+    """ Minimal inotify through ctypes: we only need to know that *something* happened. """
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def watch(self, path):
+        if self._add_watch(self.fd, os.fsencode(str(path)), WATCH_MASK) < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+
+    def wait(self, timeout):
+        """ True if events arrived within timeout (they are drained, not parsed). """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class CatalogWatcher:
+    """
+    Refreshes a catalog when its directories change and calls
+    on_change(CatalogChange) from the watcher thread. Uses inotify where
+    available (waking only on events, coalescing bursts for `debounce`
+    seconds), otherwise re-stats everything every `interval` seconds.
+    """
+
+    def __init__(self, catalog, on_change, interval=2.0, debounce=0.3):
+        self.catalog = catalog
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.mode = None
+        self._watched = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch_new_dirs(self, inotify):
+        # Directories that didn't exist yet (e.g. the user pack dir) are picked
+        # up when they appear; their contents then show up in the next refresh
+        appeared = False
+        for directory in self.catalog.dirs:
+            if directory not in self._watched and directory.is_dir():
+                try:
+                    inotify.watch(directory)
+                except OSError:
+                    continue
+                self._watched.add(directory)
+                appeared = True
+        return appeared
+
+    def _run(self):
+        try:
+            inotify = Inotify()
+            self._watch_new_dirs(inotify)
+            self.mode = "inotify"
+        except (OSError, AttributeError):
+            inotify = None
+            self.mode = "poll"
+
+        try:
+            while not self._stop.is_set():
+                if inotify is not None:
+                    fired = inotify.wait(self.interval)
+                    fired = self._watch_new_dirs(inotify) or fired
+                    if not fired:
+                        continue
+                    # Let a burst (unpacking a whole pack) settle into one refresh
+                    while inotify.wait(self.debounce):
+                        pass
+                elif self._stop.wait(self.interval):
+                    break
+                change = self.catalog.refresh()
+                if change is not None:
+                    self.on_change(change)
+        finally:
+            if inotify is not None:
+                inotify.close()
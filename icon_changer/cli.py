@@ -0,0 +1,303 @@
+"""
+Command-line front end. Nothing here imports customtkinter or needs a display:
+
+    python -m icon_changer apply mapping.json --workers 16
+    python -m icon_changer auto ~/projects --depth 3 --dry-run
+    python -m icon_changer prewarm
+    python -m icon_changer bench --output bench.json
+    python -m icon_changer rasterizers --benchmark
+    python -m icon_changer recolor folder-src tint:red tint:green hue:180
+    python -m icon_changer journal verify --under ~/projects --repair
+"""
+import argparse
+import sys
+import time
+
+from .cache import RenderCache
+from .catalog import default_catalog, set_default_dirs
+from .config import CONVERTED_DIR, CONVERTED_SIZE, CONVERTED_SIZES, PREVIEW_DIR
+from .core import IconNotFound, apply_many, best_size, converted_png, find_icon, load_mapping
+from .journal import LOST, MISSING, OK, STALE, Journal, reapply_all, repair, reset_all, verify
+from .metadata import get_backend
+from .rasterizers import RASTERIZERS, load_choice, select_fastest
+from .recolor import parse_variant, recolor_many
+from .render import prewarm
+from .trace import tracer
+from .tree import DEFAULT_IGNORES, auto_iconize
+
+
+def run_prewarm(workers):
+    def progress(done, total):
+        if done % 25 and done != total:
+            return
+        print(f"\rRendering previews: {done}/{total}", end="", flush=True)
+
+    stats = prewarm(None, PREVIEW_DIR, workers=workers, progress=progress)
+    if stats["rendered"] or stats["failed"]:
+        print()
+    print(
+        f"Rendered {stats['rendered']} of {stats['total']} icons "
+        f"({stats['cached']} already cached, {len(stats['failed'])} failed, {stats['atlas_tiles']} in atlas) "
+        f"in {stats['seconds']:.2f}s on {stats['workers']} workers: "
+        f"{stats['icons_per_second']:.1f} icons/s"
+    )
+    for svg_path, error in stats["failed"]:
+        print(f"  failed: {svg_path}: {error}", file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+def print_summary(results, quiet=False):
+    failed = [r for r in results if not r.ok]
+    if not quiet:
+        for r in results:
+            if r.ok:
+                print(f"ok    {r.target} -> {r.icon or '(reset)'}")
+    for r in failed:
+        print(f"FAIL  {r.target} -> {r.icon or '(reset)'}: {r.message}", file=sys.stderr)
+    print(f"{len(results) - len(failed)} succeeded, {len(failed)} failed")
+    return 1 if failed else 0
+
+
+def no_icons_error():
+    """ Error exit when no icon directory has any icons, instead of matching nothing. """
+    catalog = default_catalog()
+    if len(catalog):
+        return None
+    print(f"No icons found in {', '.join(map(str, catalog.dirs))}", file=sys.stderr)
+    return 2
+
+
+def open_journal(args):
+    # Applies through the fake backend never reach a file manager; don't record them
+    return None if args.backend == "fake" else Journal()
+
+
+def cmd_apply(args):
+    try:
+        pairs = load_mapping(args.mapping)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read mapping: {e}", file=sys.stderr)
+        return 2
+    if any(icon is not None for _, icon in pairs):
+        error = no_icons_error()
+        if error:
+            return error
+    results = apply_many(
+        pairs, workers=args.workers, backend=get_backend(args.backend, args.workers),
+        size=args.size, themed=args.themed, variant=args.variant, journal=open_journal(args),
+    )
+    return print_summary(results, args.quiet)
+
+
+def cmd_auto(args):
+    error = no_icons_error()
+    if error:
+        return error
+    report = None
+    if args.dry_run and not args.quiet:
+        report = lambda path, icon: print(f"{icon:24} {path}")
+    stats = auto_iconize(
+        args.root,
+        max_depth=args.depth,
+        ignore=DEFAULT_IGNORES + tuple(args.ignore),
+        include_files=not args.folders_only,
+        dry_run=args.dry_run,
+        workers=args.workers,
+        backend=None if args.dry_run else get_backend(args.backend, args.workers),
+        report=report,
+        size=args.size,
+        themed=args.themed,
+        variant=args.variant,
+        journal=None if args.dry_run else open_journal(args),
+    )
+    for target, error in stats["failed"]:
+        print(f"FAIL  {target}: {error}", file=sys.stderr)
+    if args.dry_run:
+        for icon, count in stats["per_icon"].most_common():
+            print(f"{count:8}  {icon}")
+    verb = "would apply" if args.dry_run else "applied"
+    print(
+        f"Scanned {stats['scanned']} entries in {stats['seconds']:.2f}s "
+        f"({stats['entries_per_second']:.0f}/s): {stats['matched']} matched, "
+        f"{verb} {stats['matched'] if args.dry_run else stats['applied']}, {len(stats['failed'])} failed"
+    )
+    return 1 if stats["failed"] else 0
+
+
+def cmd_prewarm(args):
+    return run_prewarm(args.workers)
+
+
+def cmd_bench(args):
+    # Imported here: it pulls in PIL and the whole pipeline
+    from .bench import run, write_report
+
+    report = run(
+        limit=args.limit,
+        workers=args.workers,
+        targets=args.targets,
+        delay=args.write_delay / 1000,
+        progress=lambda name: print(f"bench: {name}...", file=sys.stderr, flush=True),
+    )
+    write_report(report, args.output)
+    return 0
+
+
+def cmd_journal(args):
+    journal = Journal()
+    if args.action == "list":
+        for e in journal.entries(args.under):
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(e.applied_at))
+            print(f"{when}  {e.icon:24} {e.size:4}{' themed' if e.themed else ''}  {e.target}")
+        return 0
+    backend = get_backend(args.backend, args.workers)
+    if args.action == "reset":
+        return print_summary(reset_all(journal, args.under, args.workers, backend), args.quiet)
+    if args.action == "reapply":
+        return print_summary(reapply_all(journal, args.under, args.workers, backend), args.quiet)
+
+    if args.repair:
+        states, results = repair(journal, args.under, args.workers, backend, prune=args.prune)
+    else:
+        states, results = verify(journal, args.under, args.workers, backend), None
+    if not args.quiet:
+        for state in (MISSING, LOST, STALE):
+            for e in states[state]:
+                print(f"{state:8} {e.target} -> {e.icon}")
+    print(", ".join(f"{len(states[state])} {state}" for state in (OK, LOST, STALE, MISSING)))
+    if results is not None:
+        return print_summary(results, quiet=True)
+    return 1 if states[LOST] or states[STALE] else 0
+
+
+def cmd_recolor(args):
+    try:
+        svg_path = find_icon(args.icon)
+    except IconNotFound as e:
+        print(e, file=sys.stderr)
+        return 2
+    cache = RenderCache(CONVERTED_DIR).load()
+    try:
+        png_path = converted_png(svg_path, cache, best_size(args.size))
+        results = recolor_many([(png_path, variant) for variant in args.variants])
+    except RuntimeError as e:
+        print(f"FAIL  {args.icon}: {e}", file=sys.stderr)
+        return 1
+    failed = 0
+    for variant, (path, error) in zip(args.variants, results):
+        if error:
+            failed += 1
+            print(f"FAIL  {variant.key}: {error}", file=sys.stderr)
+        else:
+            print(f"{variant.key:24} {path}")
+    return 1 if failed else 0
+
+
+def cmd_rasterizers(args):
+    choice = select_fastest() if args.benchmark else load_choice()
+    results = choice["benchmark"] if choice else {}
+    for name, cls in RASTERIZERS.items():
+        if name in results:
+            result = results[name]
+            status = f"{result['ms']:.2f} ms/icon" if "ms" in result else f"rejected: {result['error']}"
+        else:
+            status = "available" if cls.available() else "not installed"
+        marker = "*" if choice and choice["backend"] == name else " "
+        print(f"{marker} {name:14} {status}")
+    if choice is None:
+        print("No rasterizer chosen yet; run with --benchmark (or prewarm) to pick one")
+    elif choice["backend"] is None:
+        print("No rasterizer rendered the sample icons correctly", file=sys.stderr)
+        return 1
+    return 0
+
+
+def variant_arg(spec):
+    try:
+        return parse_variant(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+VARIANT_HELP = "Recolor applied icons: hue:<degrees>, tint:<color>[:<strength>] or map:<from>=<to>,..."
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="icon_changer", description="Headless folder and file icon tools.")
+    parser.add_argument("--icon-dir", action="append", default=[], metavar="DIR", help="Extra icon directory, taking precedence over the user and bundled icons (repeatable)")
+    parser.add_argument("--trace", default=None, metavar="FILE", help="Write timing spans, counters and failures as a Chrome trace (JSON)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("apply", help="Apply icons from a target -> icon mapping file")
+    p.add_argument("mapping", help="JSON object, or '<target><TAB><icon>' lines; an empty icon resets the target")
+    p.add_argument("--workers", type=int, default=8, help="Maximum concurrent metadata writes (default: 8)")
+    p.add_argument("--backend", choices=("gio", "cli", "fake"), default=None, help="Metadata writer (default: in-process GIO if available, else the gio command)")
+    p.add_argument("-q", "--quiet", action="store_true", help="Only report failures and the final summary")
+    p.add_argument("--size", type=int, default=CONVERTED_SIZE, help=f"Pixel size the file manager draws icons at; rendered at the nearest of {', '.join(map(str, CONVERTED_SIZES))} that covers it (default: {CONVERTED_SIZE})")
+    p.add_argument("--themed", action="store_true", help="Install icons into ~/.local/share/icons/hicolor at every size and reference them by name")
+    p.add_argument("--variant", type=variant_arg, default=None, metavar="SPEC", help=VARIANT_HELP + " (mapping entries can also name one as <icon>@<variant>)")
+    p.set_defaults(func=cmd_apply)
+
+    p = sub.add_parser("auto", help="Walk a directory tree and apply matching icons to folders and files")
+    p.add_argument("root", help="Directory to walk")
+    p.add_argument("--depth", type=int, default=None, help="Maximum depth below root (default: unlimited)")
+    p.add_argument("--ignore", action="append", default=[], metavar="PATTERN", help=f"Extra names/globs to skip (always skipped: {', '.join(DEFAULT_IGNORES)})")
+    p.add_argument("--folders-only", action="store_true", help="Only iconize directories")
+    p.add_argument("--dry-run", action="store_true", help="Report matches without rendering or writing anything")
+    p.add_argument("--workers", type=int, default=4, help="Metadata batches in flight (default: 4)")
+    p.add_argument("--backend", choices=("gio", "cli", "fake"), default=None, help="Metadata writer (default: in-process GIO if available, else the gio command)")
+    p.add_argument("-q", "--quiet", action="store_true", help="Don't list individual matches in a dry run")
+    p.add_argument("--size", type=int, default=CONVERTED_SIZE, help=f"Pixel size the file manager draws icons at; rendered at the nearest of {', '.join(map(str, CONVERTED_SIZES))} that covers it (default: {CONVERTED_SIZE})")
+    p.add_argument("--themed", action="store_true", help="Install icons into ~/.local/share/icons/hicolor at every size and reference them by name")
+    p.add_argument("--variant", type=variant_arg, default=None, metavar="SPEC", help=VARIANT_HELP)
+    p.set_defaults(func=cmd_auto)
+
+    p = sub.add_parser("prewarm", help="Render every preview thumbnail into the cache")
+    p.add_argument("--workers", type=int, default=None, help="Number of render processes (default: CPU count)")
+    p.set_defaults(func=cmd_prewarm)
+
+    p = sub.add_parser("bench", help="Benchmark rendering, caching, search, resolution and apply; writes JSON")
+    p.add_argument("-o", "--output", default="-", help="JSON report path (default: stdout)")
+    p.add_argument("--limit", type=int, default=None, help="Only use the first N bundled icons (default: all)")
+    p.add_argument("--workers", type=int, default=None, help="Number of render processes (default: CPU count)")
+    p.add_argument("--targets", type=int, default=500, help="Targets in the bulk apply benchmark (default: 500)")
+    p.add_argument("--write-delay", type=float, default=2.0, metavar="MS", help="Simulated cost of one metadata write (default: 2)")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("recolor", help="Render color variants of an icon without re-rendering the SVG; prints their paths")
+    p.add_argument("icon", help="Icon name or SVG path")
+    p.add_argument("variants", nargs="+", type=variant_arg, metavar="VARIANT", help="hue:<degrees>, tint:<color>[:<strength>] or map:<from>=<to>,...")
+    p.add_argument("--size", type=int, default=CONVERTED_SIZE, help=f"Pixel size (default: {CONVERTED_SIZE})")
+    p.set_defaults(func=cmd_recolor)
+
+    p = sub.add_parser("journal", help="List, reset, re-apply or verify every icon applied so far")
+    p.add_argument("action", choices=("list", "reset", "reapply", "verify"))
+    p.add_argument("--under", default=None, metavar="DIR", help="Only targets in this directory tree")
+    p.add_argument("--repair", action="store_true", help="verify: re-apply icons whose metadata or rendered file is gone")
+    p.add_argument("--prune", action="store_true", help="verify --repair: forget targets that no longer exist")
+    p.add_argument("--workers", type=int, default=8, help="Maximum concurrent metadata reads/writes (default: 8)")
+    p.add_argument("--backend", choices=("gio", "cli", "fake"), default=None, help="Metadata backend (default: in-process GIO if available, else the gio command)")
+    p.add_argument("-q", "--quiet", action="store_true", help="Only report problems and the final summary")
+    p.set_defaults(func=cmd_journal)
+
+    p = sub.add_parser("rasterizers", help="List the SVG rasterizers and which one is used")
+    p.add_argument("--benchmark", action="store_true", help="Re-run the benchmark and save the fastest correct rasterizer")
+    p.set_defaults(func=cmd_rasterizers)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "themed", False) and getattr(args, "variant", None) is not None:
+        parser.error("--variant can't be combined with --themed")
+    if args.trace:
+        tracer.enable()
+    # Built on first use, so commands that don't need it (bench) never scan or save it
+    set_default_dirs(args.icon_dir)
+    try:
+        return args.func(args)
+    finally:
+        if args.trace:
+            tracer.write(args.trace)
@@ -0,0 +1,51 @@
+import os
+import sys
+from pathlib import Path
+
+
+def resource_path(relative_path):
+    """ Get absolute path to resource, works for dev and for PyInstaller """
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        # The checkout root, wherever the process was started from
+        base_path = Path(__file__).resolve().parent.parent
+
+    return Path(os.path.join(base_path, relative_path))
+
+# Configuration
+ICON_DIR = resource_path("icons")
+CACHE_DIR = Path.home() / ".cache" / "folder-icon-changer"
+PREVIEW_DIR = CACHE_DIR / "previews"
+CONVERTED_DIR = CACHE_DIR / "converted"
+# Recolored variants of converted icons (see recolor.py)
+VARIANT_DIR = CACHE_DIR / "variants"
+
+PREVIEW_SIZE = 64
+# Default size applied icons are rendered at, and the set of sizes they can be
+# rendered at so the file manager gets one close to what it draws
+CONVERTED_SIZE = 256
+CONVERTED_SIZES = (16, 32, 48, 64, 128, 256, 512)
+
+CONFIG_DIR = Path.home() / ".config" / "folder-icon-changer"
+# Optional user overrides: {"extensions": {...}, "filenames": {...}, "folders": {...}}
+USER_ALIASES_PATH = CONFIG_DIR / "aliases.json"
+
+# Memory budget for decoded thumbnails kept in RAM (--image-cache-mb)
+IMAGE_CACHE_BUDGET = 64 * 1024 * 1024
+
+# User-level icon theme that --themed installs converted icons into
+ICON_THEME_DIR = Path.home() / ".local" / "share" / "icons" / "hicolor"
+
+# What was applied where (see journal.py); not under CACHE_DIR, so clearing
+# the cache doesn't lose it
+JOURNAL_PATH = CONFIG_DIR / "journal.sqlite3"
+
+# Extra icon packs: SVGs here override bundled icons of the same name
+USER_ICON_DIR = CONFIG_DIR / "icons"
+# Persisted snapshot of every icon directory, diffed to find changes
+CATALOG_PATH = CACHE_DIR / "catalog.json"
+
+# Catalog and preview atlas precomputed by build.py, shipped in the bundle
+PREBUILT_DIR = resource_path("prebuilt")
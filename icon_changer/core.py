@@ -0,0 +1,259 @@
+import json
+from collections import namedtuple
+from pathlib import Path
+
+from .cache import RenderCache
+from .catalog import default_catalog
+from .config import CONVERTED_DIR, CONVERTED_SIZE, CONVERTED_SIZES
+from .metadata import CUSTOM_ICON, CUSTOM_ICON_NAME, get_backend
+from .recolor import parse_variant, recolor, recolor_many
+from .render import render_job, render_sizes
+from .theme import install_icons
+
+# icon is None for a reset
+ApplyResult = namedtuple("ApplyResult", "target icon ok message")
+
+
+class IconNotFound(LookupError):
+    pass
+
+
+def find_icon(name, icon_dir=None):
+    """
+    Resolve an icon name ("python", "python.svg" or a path) to its SVG, in
+    icon_dir if given, else through the catalog of all icon directories.
+    """
+    candidate = Path(name)
+    if candidate.suffix == ".svg" and candidate.is_file():
+        return candidate
+    stem = candidate.stem if candidate.suffix == ".svg" else name
+    if icon_dir is None:
+        svg_path = default_catalog().get(stem)
+    else:
+        svg_path = Path(icon_dir) / f"{stem}.svg"
+    if svg_path is None or not svg_path.is_file():
+        raise IconNotFound(f"No icon named '{name}'")
+    return svg_path
+
+
+def split_variant(icon, default=None):
+    """
+    Split "folder-src@tint:red" into ("folder-src", Variant); an icon without
+    a variant gets `default`. ValueError if the variant is malformed.
+    """
+    name, sep, spec = icon.rpartition("@")
+    if sep and ":" in spec:
+        return name, parse_variant(spec)
+    return icon, default
+
+
+def icon_label(icon, variant=None):
+    """ How an applied icon is named in the journal: "folder-src" or "folder-src@tint:#ff0000:1". """
+    icon = str(icon)
+    # Catalog icons by name, so the label survives reinstalls; others by absolute path
+    svg_path = Path(icon)
+    if svg_path.suffix == ".svg":
+        icon = svg_path.stem if default_catalog().get(svg_path.stem) == svg_path else str(svg_path.resolve())
+    return icon if variant is None else f"{icon}@{variant.key}"
+
+
+def load_mapping(path):
+    """
+    Read a target -> icon mapping file. Either a JSON object, or plain text
+    with one "<target><TAB><icon>" pair per line ('#' starts a comment).
+    An empty / null icon means reset the target.
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    if Path(path).suffix.lower() == ".json":
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("mapping file must contain a JSON object of target -> icon")
+        return [(target, icon or None) for target, icon in data.items()]
+
+    pairs = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        # Only strip spaces: a trailing TAB with no icon is a reset
+        line = line.strip(" ")
+        if not line or line.startswith("#"):
+            continue
+        target, sep, icon = line.partition("\t")
+        if not sep:
+            raise ValueError(f"{path}:{lineno}: expected '<target><TAB><icon>'")
+        pairs.append((target.strip(), icon.strip() or None))
+    return pairs
+
+
+def best_size(wanted, sizes=CONVERTED_SIZES):
+    """ Smallest size in the set that covers `wanted` pixels (the largest if none does). """
+    sizes = sorted(sizes)
+    for size in sizes:
+        if size >= wanted:
+            return size
+    return sizes[-1]
+
+
+def converted_png(svg_path, cache, size=CONVERTED_SIZE):
+    """ Path of the rendered PNG for svg_path, rendering it on a cache miss. """
+    png_path = cache.lookup(svg_path, size, check=True)
+    if png_path is None:
+        png_path = cache.path_for(svg_path, size)
+        _, error = render_job((svg_path, png_path, size))
+        if error:
+            raise RuntimeError(error)
+        cache.record(svg_path, size)
+        cache.save()
+    return png_path
+
+
+def set_custom_icon(target, png_path, backend=None):
+    error = (backend or get_backend()).write(target, f"file://{png_path}")
+    return ApplyResult(str(target), str(png_path), error is None, error or "Icon applied successfully!")
+
+
+def set_themed_icon(target, icon_name, backend=None):
+    backend = backend or get_backend()
+    error = backend.write(target, icon_name, CUSTOM_ICON_NAME)
+    if error is None:
+        # A custom-icon file URI takes precedence over the name; drop any old one
+        backend.write(target, None, CUSTOM_ICON)
+    return ApplyResult(str(target), icon_name, error is None, error or "Icon applied successfully!")
+
+
+def reset_icon(target, backend=None, journal=None):
+    backend = backend or get_backend()
+    error = backend.write(target, None)
+    if error is None:
+        error = backend.write(target, None, CUSTOM_ICON_NAME)
+    if error is None and journal is not None:
+        journal.forget_many([target])
+    return ApplyResult(str(target), None, error is None, error or "Icon reset successfully.")
+
+
+def apply_icon(target, svg_path, cache=None, backend=None, size=CONVERTED_SIZE, themed=False, variant=None, journal=None):
+    """
+    Convert svg_path if needed and set it as target's custom icon, using the
+    size from CONVERTED_SIZES that best covers `size` pixels, recolored with
+    variant if given. With themed, the icon is installed into the user icon
+    theme at every size instead and referenced by name. A successful apply
+    is recorded in journal, if given.
+    """
+    if cache is None:
+        cache = RenderCache(CONVERTED_DIR).load()
+    if themed and variant is not None:
+        return ApplyResult(str(target), Path(svg_path).stem, False, "Color variants can't be installed into the icon theme")
+    if themed:
+        # A handful of renders: cheaper in-process than starting a pool
+        names, errors = install_icons([svg_path], cache, workers=1)
+        if errors:
+            return ApplyResult(str(target), Path(svg_path).stem, False, next(iter(errors.values())))
+        value = names[str(svg_path)]
+        result = set_themed_icon(target, value, backend)
+    else:
+        try:
+            png_path = converted_png(svg_path, cache, best_size(size))
+            if variant is not None:
+                png_path = recolor(png_path, variant)
+        except Exception as e:
+            return ApplyResult(str(target), Path(svg_path).stem, False, f"Render failed: {e}")
+        value = f"file://{png_path}"
+        result = set_custom_icon(target, png_path, backend)
+    if result.ok and journal is not None:
+        journal.record_many([(target, icon_label(svg_path, variant), best_size(size), themed, value)])
+    return result._replace(icon=Path(svg_path).stem)
+
+
+def apply_many(pairs, workers=8, icon_dir=None, cache=None, backend=None, size=CONVERTED_SIZE, themed=False, variant=None,
+               journal=None):
+    """
+    Apply (target, icon_name) pairs in bulk; an icon_name of None resets the
+    target. Each distinct icon is converted once (in parallel on a process
+    pool) at the best size for `size`, then all metadata goes to the backend
+    as a single batch (with the CLI backend, at most `workers` gio calls in
+    flight). With themed, icons are installed into the user icon theme
+    (with one icon-cache refresh) and targets get their names instead.
+    An icon_name may carry a color variant ("folder-src@tint:red", see
+    recolor.py); `variant` is used for those that don't. Successful applies
+    and resets are recorded in journal, if given, in one transaction.
+    Returns one ApplyResult per pair, in input order.
+    """
+    size = best_size(size)
+    if cache is None:
+        cache = RenderCache(CONVERTED_DIR).load()
+    if backend is None:
+        backend = get_backend(workers=workers)
+
+    results = [None] * len(pairs)
+    svg_for = {}
+    variant_for = {}
+    label_for = {}
+    for i, (target, icon) in enumerate(pairs):
+        if not Path(target).exists():
+            results[i] = ApplyResult(str(target), icon, False, "Target does not exist")
+        elif icon is not None and icon not in svg_for:
+            try:
+                name, variant_for[icon] = split_variant(icon, variant)
+                if themed and variant_for[icon] is not None:
+                    raise ValueError("Color variants can't be installed into the icon theme")
+                svg_for[icon] = find_icon(name, icon_dir)
+                if journal is not None:
+                    label_for[icon] = icon_label(svg_for[icon] if Path(name).suffix == ".svg" else name, variant_for[icon])
+            except (IconNotFound, ValueError) as e:
+                svg_for[icon] = e
+
+    # Render every missing conversion up front, across processes
+    svg_paths = {p for p in svg_for.values() if isinstance(p, Path)}
+    if themed:
+        names, render_errors = install_icons(svg_paths, cache)
+    else:
+        render_errors = render_sizes(svg_paths, cache, (size,))
+        # Then every distinct (icon, variant), each source PNG decoded once
+        tinted = [
+            icon for icon, v in variant_for.items()
+            if v is not None and isinstance(svg_for[icon], Path) and str(svg_for[icon]) not in render_errors
+        ]
+        jobs = [(cache.path_for(svg_for[icon], size), variant_for[icon]) for icon in tinted]
+        try:
+            recolored = dict(zip(tinted, recolor_many(jobs))) if jobs else {}
+        except RuntimeError as e:  # NumPy missing
+            recolored = {icon: (None, str(e)) for icon in tinted}
+
+    batch = []  # (result index, target, value)
+    for i, (target, icon) in enumerate(pairs):
+        if results[i] is not None:
+            continue
+        if icon is None:
+            batch.append((i, target, None))
+            continue
+        svg_path = svg_for[icon]
+        if isinstance(svg_path, Exception):
+            results[i] = ApplyResult(str(target), icon, False, str(svg_path))
+        elif str(svg_path) in render_errors:
+            results[i] = ApplyResult(str(target), icon, False, f"Render failed: {render_errors[str(svg_path)]}")
+        elif themed:
+            batch.append((i, target, names[str(svg_path)]))
+        elif variant_for[icon] is not None:
+            png_path, error = recolored[icon]
+            if error:
+                results[i] = ApplyResult(str(target), icon, False, f"Recolor failed: {error}")
+            else:
+                batch.append((i, target, f"file://{png_path}"))
+        else:
+            batch.append((i, target, f"file://{cache.path_for(svg_path, size)}"))
+
+    items = [(target, value) for _, target, value in batch]
+    errors = backend.write_many(items, CUSTOM_ICON_NAME if themed else CUSTOM_ICON)
+    # Leave only one of the two attributes set: the file URI wins in the file
+    # manager, so a themed apply clears it, and a reset clears both
+    cleared = [(target, None) for (target, value), error in zip(items, errors) if error is None and (themed or value is None)]
+    if cleared:
+        backend.write_many(cleared, CUSTOM_ICON if themed else CUSTOM_ICON_NAME)
+    for (i, target, value), error in zip(batch, errors):
+        icon = pairs[i][1]
+        ok_message = "Icon reset successfully." if value is None else "Icon applied successfully!"
+        results[i] = ApplyResult(str(target), icon, error is None, error or ok_message)
+
+    if journal is not None:
+        done = [(i, target, value) for (i, target, value), error in zip(batch, errors) if error is None]
+        journal.record_many((target, label_for[pairs[i][1]], size, themed, value) for i, target, value in done if value is not None)
+        journal.forget_many(target for _, target, value in done if value is None)
+    return results
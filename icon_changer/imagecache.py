@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+
+from .config import IMAGE_CACHE_BUDGET
+
+
+def image_nbytes(image):
+    """ Approximate memory held by a decoded PIL image. """
+    width, height = image.size
+    return width * height * len(image.getbands())
+
+
+class ImageLRU:
+    """
+    Least-recently-used cache of decoded images, bounded by an approximate
+    byte budget rather than an entry count. Keys are up to the caller, e.g.
+    ("pil", svg_path, 64) or ("ctk", svg_path, 48). Thread-safe.
+    """
+
+    def __init__(self, budget=IMAGE_CACHE_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.used -= old[1]
+            if nbytes > self.budget:
+                return value
+            self._entries[key] = (value, nbytes)
+            self.used += nbytes
+            while self.used > self.budget:
+                _, (_, freed) = self._entries.popitem(last=False)
+                self.used -= freed
+                self.evictions += 1
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.used -= entry[1]
+
+    def resize(self, budget):
+        with self._lock:
+            self.budget = budget
+            while self.used > self.budget and self._entries:
+                _, (_, freed) = self._entries.popitem(last=False)
+                self.used -= freed
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.used,
+                "budget": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Shared by everything in the process that shows thumbnails
+images = ImageLRU()
@@ -0,0 +1,191 @@
+"""
+Journal of applied icons: which icon (and variant) went on which target, at
+what size, and the exact metadata value written. It lives in an SQLite file
+under CONFIG_DIR and is updated in one transaction per apply batch.
+
+With it, every icon under a directory can be reset or re-applied in one
+pass, and metadata that was lost (a restore, a home directory migration) or
+that points at a render that no longer exists can be found and rebuilt. All
+of these go through apply_many(), i.e. the same batched metadata backend.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from .cache import RenderCache
+from .config import CONVERTED_DIR, CONVERTED_SIZE, CONVERTED_SIZES, JOURNAL_PATH
+from .core import IconNotFound, apply_many, best_size, find_icon, split_variant
+from .metadata import CUSTOM_ICON, CUSTOM_ICON_NAME, get_backend
+from .theme import theme_path
+
+SCHEMA_VERSION = 1
+
+JournalEntry = namedtuple("JournalEntry", "target icon size themed value applied_at")
+
+# verify() states
+OK = "ok"
+MISSING = "missing"  # the target itself is gone
+LOST = "lost"  # metadata no longer holds the value we wrote
+STALE = "stale"  # metadata is intact but the PNG / theme icon it names is gone
+
+
+class Journal:
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = Path(path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Called with the lock held; the GUI writes from worker threads
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                with conn:
+                    conn.execute("DROP TABLE IF EXISTS applied")
+                    conn.execute(
+                        "CREATE TABLE applied ("
+                        " target TEXT PRIMARY KEY,"
+                        " icon TEXT NOT NULL,"
+                        " size INTEGER NOT NULL,"
+                        " themed INTEGER NOT NULL,"
+                        " value TEXT NOT NULL,"
+                        " applied_at REAL NOT NULL)"
+                    )
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn = conn
+        return self._conn
+
+    def record_many(self, rows):
+        """ Record (target, icon, size, themed, value) rows, replacing older ones, in one transaction. """
+        now = time.time()
+        rows = [(os.path.abspath(target), icon, size, int(themed), value, now) for target, icon, size, themed, value in rows]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO applied VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def forget_many(self, targets):
+        rows = [(os.path.abspath(target),) for target in targets]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("DELETE FROM applied WHERE target = ?", rows)
+
+    def entries(self, under=None):
+        """ Every entry, or those for `under` and everything beneath it, sorted by target. """
+        query = "SELECT target, icon, size, themed, value, applied_at FROM applied"
+        args = ()
+        if under is not None:
+            # A range on the primary key rather than LIKE: paths may contain % and _
+            root = os.path.abspath(os.path.expanduser(str(under))).rstrip(os.sep) or os.sep
+            prefix = root if root.endswith(os.sep) else root + os.sep
+            query += " WHERE target = ? OR (target >= ? AND target < ?)"
+            args = (root, prefix, prefix[:-1] + chr(ord(os.sep) + 1))
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY target", args).fetchall()
+        return [JournalEntry(t, i, s, bool(th), v, a) for t, i, s, th, v, a in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM applied").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def reset_all(journal, under=None, workers=8, backend=None):
+    """ Reset every journaled target (under `under`) in one batch. Returns the ApplyResults. """
+    pairs = [(e.target, None) for e in journal.entries(under)]
+    return apply_many(pairs, workers=workers, backend=backend, journal=journal)
+
+
+def reapply(journal, entries, workers=8, backend=None, cache=None):
+    """
+    Apply the journaled icon of every entry again, one apply_many() batch per
+    (size, themed) combination. Missing renders are re-rendered.
+    Returns the ApplyResults.
+    """
+    groups = {}
+    for e in entries:
+        groups.setdefault((e.size or CONVERTED_SIZE, e.themed), []).append((e.target, e.icon))
+    results = []
+    for (size, themed), pairs in groups.items():
+        results += apply_many(pairs, workers=workers, backend=backend, cache=cache, size=size, themed=themed, journal=journal)
+    return results
+
+
+def reapply_all(journal, under=None, workers=8, backend=None):
+    return reapply(journal, journal.entries(under), workers, backend)
+
+
+def _target_of(value, themed):
+    # The file the written metadata points at, if it should exist. URIs are
+    # written as "file://" + the raw path, so no unquoting.
+    if themed:
+        return theme_path(value, max(CONVERTED_SIZES))
+    return Path(value[len("file://"):]) if value.startswith("file://") else None
+
+
+def verify(journal, under=None, workers=8, backend=None):
+    """
+    Read back the metadata of every journaled target (in batches, through
+    the backend) and classify it. Returns {state: [JournalEntry]} with the
+    states OK, MISSING, LOST and STALE.
+    """
+    backend = backend or get_backend(workers=workers)
+    states = {OK: [], MISSING: [], LOST: [], STALE: []}
+    present = []
+    for e in journal.entries(under):
+        (present if os.path.lexists(e.target) else states[MISSING]).append(e)
+
+    for themed in (False, True):
+        group = [e for e in present if e.themed == themed]
+        values = backend.read_many([e.target for e in group], CUSTOM_ICON_NAME if themed else CUSTOM_ICON)
+        for e, value in zip(group, values):
+            if value != e.value:
+                states[LOST].append(e)
+                continue
+            path = _target_of(e.value, themed)
+            states[STALE if path is not None and not path.exists() else OK].append(e)
+    return states
+
+
+def repair(journal, under=None, workers=8, backend=None, prune=False):
+    """
+    verify(), then re-apply every lost or stale entry in one pass. With
+    prune, entries whose target is gone are dropped from the journal.
+    Returns (states, ApplyResults of the repairs).
+    """
+    backend = backend or get_backend(workers=workers)
+    states = verify(journal, under, workers, backend)
+
+    # The manifest still lists renders whose PNGs were deleted under it; drop
+    # them so apply_many renders them again
+    cache = RenderCache(CONVERTED_DIR).load()
+    for e in states[STALE]:
+        name, _ = split_variant(e.icon)
+        try:
+            svg_path = find_icon(name)
+        except IconNotFound:
+            continue
+        for size in CONVERTED_SIZES if e.themed else (best_size(e.size),):
+            if not cache.path_for(svg_path, size).exists():
+                cache.discard(svg_path, size)
+
+    results = reapply(journal, states[LOST] + states[STALE], workers, backend, cache)
+    if prune:
+        journal.forget_many(e.target for e in states[MISSING])
+    return states, results
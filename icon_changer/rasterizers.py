@@ -0,0 +1,283 @@
+"""
+SVG rasterizer backends. Each one turns an SVG into a size x size PNG; which
+are usable depends on what is installed. A short benchmark over a few
+bundled icons picks the fastest one that renders them correctly, and the
+choice is saved so later runs (and every render worker process) just read
+it. render() falls back to the other backends for any SVG the chosen one
+fails on.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .config import CACHE_DIR, ICON_DIR
+from .trace import tracer
+
+CHOICE_PATH = CACHE_DIR / "rasterizer.json"
+# Overrides CHOICE_PATH; an environment variable so spawned render workers follow it
+CHOICE_ENV = "FOLDER_ICON_CHANGER_RASTERIZER_CHOICE"
+CHOICE_VERSION = 2
+# Icons with gradients, masks, text and transforms, to catch partial support
+BENCH_ICONS = ("python", "folder-src", "typescript", "docker", "json", "react", "markdown", "git")
+
+
+class Rasterizer:
+    name = "base"
+
+    @classmethod
+    def available(cls):
+        raise NotImplementedError
+
+    def render(self, svg_path, png_path, size):
+        raise NotImplementedError
+
+
+class CairoSvgRasterizer(Rasterizer):
+    """ cairosvg, in-process. """
+    name = "cairosvg"
+
+    @classmethod
+    def available(cls):
+        try:
+            import cairosvg  # noqa: F401 (also fails if libcairo can't be loaded)
+        except Exception:
+            return False
+        return True
+
+    def render(self, svg_path, png_path, size):
+        import cairosvg
+        cairosvg.svg2png(url=str(svg_path), write_to=str(png_path), output_width=size, output_height=size)
+
+
+class RsvgRasterizer(Rasterizer):
+    """ librsvg through PyGObject and pycairo, in-process. """
+    name = "rsvg"
+
+    @classmethod
+    def available(cls):
+        try:
+            cls._modules()
+        except Exception:
+            return False
+        return True
+
+    @staticmethod
+    def _modules():
+        import cairo
+        import gi
+        gi.require_version("Rsvg", "2.0")
+        from gi.repository import Rsvg
+        return cairo, Rsvg
+
+    def render(self, svg_path, png_path, size):
+        cairo, Rsvg = self._modules()
+        handle = Rsvg.Handle.new_from_file(str(svg_path))
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, size, size)
+        viewport = Rsvg.Rectangle()
+        viewport.x, viewport.y, viewport.width, viewport.height = 0, 0, size, size
+        handle.render_document(cairo.Context(surface), viewport)
+        surface.write_to_png(str(png_path))
+
+
+class CommandRasterizer(Rasterizer):
+    """ An external converter, one process per SVG. """
+    command = None
+
+    @classmethod
+    def available(cls):
+        return shutil.which(cls.command) is not None
+
+    def args(self, svg_path, png_path, size):
+        raise NotImplementedError
+
+    def render(self, svg_path, png_path, size):
+        result = subprocess.run(self.args(str(svg_path), str(png_path), size), capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"{self.command} exited with {result.returncode}")
+
+
+class RsvgConvertRasterizer(CommandRasterizer):
+    name = "rsvg-convert"
+    command = "rsvg-convert"
+
+    def args(self, svg_path, png_path, size):
+        return [self.command, "-f", "png", "-w", str(size), "-h", str(size), "-o", png_path, svg_path]
+
+
+class ResvgRasterizer(CommandRasterizer):
+    name = "resvg"
+    command = "resvg"
+
+    def args(self, svg_path, png_path, size):
+        return [self.command, "-w", str(size), "-h", str(size), svg_path, png_path]
+
+
+# Also the fallback order when no benchmark has picked one yet
+RASTERIZERS = {cls.name: cls for cls in (CairoSvgRasterizer, RsvgRasterizer, RsvgConvertRasterizer, ResvgRasterizer)}
+
+
+def available_rasterizers():
+    return [cls() for cls in RASTERIZERS.values() if cls.available()]
+
+
+def choice_path():
+    return Path(os.environ.get(CHOICE_ENV) or CHOICE_PATH)
+
+
+@contextmanager
+def use_choice_path(path):
+    """ Read and save the choice at path instead (e.g. a benchmark's temp dir) while inside the block. """
+    global _chain
+    old = os.environ.get(CHOICE_ENV)
+    os.environ[CHOICE_ENV] = str(path)
+    with _chain_lock:
+        _chain = None
+    try:
+        yield
+    finally:
+        if old is None:
+            del os.environ[CHOICE_ENV]
+        else:
+            os.environ[CHOICE_ENV] = old
+        with _chain_lock:
+            _chain = None
+
+
+def load_choice(path=None):
+    path = path or choice_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != CHOICE_VERSION:
+        return None
+    return data
+
+
+def check_png(png_path, size):
+    """ Error string if png_path isn't a size x size image with something drawn in it, else None. """
+    from PIL import Image
+
+    try:
+        with Image.open(png_path) as image:
+            if image.size != (size, size):
+                return f"wrong size {image.size[0]}x{image.size[1]}"
+            alpha = image.convert("RGBA").getchannel("A")
+            if alpha.getextrema()[1] == 0:
+                return "empty image"
+    except Exception as e:
+        return f"unreadable output: {e}"
+    return None
+
+
+def benchmark(rasterizers=None, samples=None, size=64, rounds=2):
+    """
+    Time every rasterizer over the sample SVGs, checking each output.
+    Returns {name: {"ms": per-icon milliseconds} or {"error": reason}}.
+    """
+    if rasterizers is None:
+        rasterizers = available_rasterizers()
+    if samples is None:
+        samples = [ICON_DIR / f"{name}.svg" for name in BENCH_ICONS]
+        samples = [p for p in samples if p.is_file()] or sorted(ICON_DIR.glob("*.svg"))[:8]
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="icon-changer-raster-") as tmp:
+        for rasterizer in rasterizers:
+            try:
+                # The first round also checks the output and warms up imports
+                for i, svg_path in enumerate(samples):
+                    png_path = Path(tmp) / f"{rasterizer.name}-{i}.png"
+                    rasterizer.render(svg_path, png_path, size)
+                    error = check_png(png_path, size)
+                    if error:
+                        raise RuntimeError(f"{svg_path.name}: {error}")
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    for i, svg_path in enumerate(samples):
+                        rasterizer.render(svg_path, Path(tmp) / f"{rasterizer.name}-{i}.png", size)
+                elapsed = time.perf_counter() - start
+                results[rasterizer.name] = {"ms": elapsed / (rounds * len(samples)) * 1000}
+            except Exception as e:
+                results[rasterizer.name] = {"error": str(e)}
+    return results
+
+
+def select_fastest(path=None, **kwargs):
+    """ Benchmark, save the fastest correct rasterizer as the choice and return the saved record. """
+    global _chain
+    path = path or choice_path()
+    results = benchmark(**kwargs)
+    timed = {name: r["ms"] for name, r in results.items() if "ms" in r}
+    choice = {
+        "version": CHOICE_VERSION,
+        # None if nothing passed; saved all the same so it isn't re-run each launch
+        "backend": min(timed, key=timed.get) if timed else None,
+        "available": sorted(results),
+        "benchmark": results,
+        "timestamp": int(time.time()),
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = Path(path).with_name(f".{Path(path).name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(choice, f, indent=2)
+    os.replace(tmp_path, path)
+    with _chain_lock:
+        _chain = None
+    return choice
+
+
+def ensure_selected(path=None):
+    """
+    Run the first-run benchmark unless a choice was saved for the same set of
+    installed rasterizers (including a choice of none).
+    """
+    choice = load_choice(path)
+    if choice and choice.get("available") == sorted(r.name for r in available_rasterizers()):
+        return choice
+    return select_fastest(path)
+
+
+# Built once per process (render threads share it) and replaced, never
+# mutated, when a new choice is saved
+_chain = None
+_chain_lock = threading.Lock()
+
+
+def rasterizer_chain():
+    """ The chosen rasterizer followed by every other available one. """
+    global _chain
+    with _chain_lock:
+        if _chain is None:
+            rasterizers = available_rasterizers()
+            choice = load_choice()
+            chosen = choice.get("backend") if choice else None
+            rasterizers.sort(key=lambda r: r.name != chosen)
+            _chain = rasterizers
+        return _chain
+
+
+def render(svg_path, png_path, size):
+    """ Render with the chosen rasterizer, falling back to the others for this SVG if it fails. """
+    chain = rasterizer_chain()
+    if not chain:
+        raise RuntimeError("No SVG rasterizer available (install cairosvg, librsvg or resvg)")
+    errors = []
+    for rasterizer in chain:
+        try:
+            rasterizer.render(svg_path, png_path, size)
+        except Exception as e:
+            tracer.failure(f"rasterize.{rasterizer.name}", svg_path, e)
+            errors.append(f"{rasterizer.name}: {e}")
+            continue
+        if errors:
+            tracer.count("rasterize.fallback")
+        return rasterizer.name
+    raise RuntimeError("; ".join(errors))
@@ -0,0 +1,215 @@
+"""
+Color variants of already rasterized icons, e.g. a red or green folder-src
+per project state. A variant is an operation on the RGBA pixels of a cached
+PNG, done as a few whole-array NumPy operations, so no SVG is re-rendered:
+
+    hue:<degrees>                   rotate hues (CSS hue-rotate)
+    tint:<color>[:<strength>]       recolor, keeping the icon's shading
+    map:<from>=<to>[,<from>=<to>]   swap specific colors (and their shades)
+
+Colors are anything Pillow understands ("#e53935", "red", "rgb(0,128,0)").
+Results are cached as <source stem>-<variant hash>.png in VARIANT_DIR; the
+source stem is its content digest and size, so they never go stale. Like
+converted renders they are never evicted, since applied targets point at
+them by path.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from .config import VARIANT_DIR
+from .trace import tracer
+
+# Max RGB distance from a map: color for a pixel to count as that color
+MAP_TOLERANCE = 40
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Recoloring needs NumPy (pip install numpy)") from None
+    return numpy
+
+
+def _color(text):
+    from PIL import ImageColor
+
+    try:
+        return ImageColor.getrgb(text.strip())[:3]
+    except ValueError:
+        raise ValueError(f"Unknown color '{text}'") from None
+
+
+def _hex(rgb):
+    return "#%02x%02x%02x" % rgb
+
+
+class Variant:
+    """ A parsed variant spec; apply() recolors an RGBA uint8 array. """
+
+    def __init__(self, op, args):
+        self.op = op
+        self.args = args
+        if op == "hue":
+            self.key = f"hue:{args[0] % 360:g}"
+        elif op == "tint":
+            self.key = f"tint:{_hex(args[0])}:{args[1]:g}"
+        else:
+            self.key = "map:" + ",".join(f"{_hex(a)}={_hex(b)}" for a, b in args)
+        # Short and filesystem-safe, stable across runs
+        self.slug = hashlib.blake2b(self.key.encode(), digest_size=4).hexdigest()
+
+    def __repr__(self):
+        return f"Variant({self.key!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Variant) and other.key == self.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def apply(self, rgba):
+        np = _numpy()
+        rgb = rgba[..., :3].astype(np.float32)
+        if self.op == "hue":
+            out = rgb @ _hue_matrix(np, self.args[0]).T
+        elif self.op == "tint":
+            out = _tint(np, rgb, self.args[0], self.args[1])
+        else:
+            out = _map_colors(np, rgb, self.args)
+        result = rgba.copy()
+        result[..., :3] = np.clip(out + 0.5, 0, 255).astype(np.uint8)
+        return result
+
+
+def parse_variant(spec):
+    """ Variant from a spec string such as "tint:#e53935" (see module docstring); ValueError if malformed. """
+    op, _, rest = spec.strip().partition(":")
+    op = op.lower()
+    try:
+        if op == "hue":
+            return Variant(op, (float(rest),))
+        if op == "tint":
+            # Pillow color strings never contain ':'
+            color, _, strength = rest.partition(":")
+            strength = float(strength) if strength else 1.0
+            if not 0.0 <= strength <= 1.0:
+                raise ValueError("strength must be between 0 and 1")
+            return Variant(op, (_color(color), strength))
+        if op == "map":
+            pairs = []
+            for item in rest.split(","):
+                a, sep, b = item.partition("=")
+                if not sep:
+                    raise ValueError(f"expected <from>=<to>, got '{item}'")
+                pairs.append((_color(a), _color(b)))
+            return Variant(op, tuple(pairs))
+    except ValueError as e:
+        raise ValueError(f"Bad variant '{spec}': {e}") from None
+    raise ValueError(f"Bad variant '{spec}': expected hue:, tint: or map:")
+
+
+def _hue_matrix(np, degrees):
+    # The feColorMatrix hueRotate matrix (as used by CSS hue-rotate()): a
+    # rotation about the gray axis that roughly preserves luminance
+    a = np.radians(degrees)
+    c, s = np.cos(a), np.sin(a)
+    return np.array([
+        [0.213 + c * 0.787 - s * 0.213, 0.715 - c * 0.715 - s * 0.715, 0.072 - c * 0.072 + s * 0.928],
+        [0.213 - c * 0.213 + s * 0.143, 0.715 + c * 0.285 + s * 0.140, 0.072 - c * 0.072 - s * 0.283],
+        [0.213 - c * 0.213 - s * 0.787, 0.715 - c * 0.715 + s * 0.715, 0.072 + c * 0.928 + s * 0.072],
+    ], dtype=np.float32)
+
+
+def _tint(np, rgb, color, strength):
+    # Colorize: mid-gray becomes `color`, darker shades go towards black and
+    # lighter ones towards white, so highlights and outlines survive
+    lum = (rgb @ np.array([0.2126, 0.7152, 0.0722], dtype=np.float32))[..., None] / 255.0
+    color = np.array(color, dtype=np.float32)
+    tinted = np.where(lum < 0.5, color * (2.0 * lum), color + (255.0 - color) * (2.0 * lum - 1.0))
+    return rgb + (tinted - rgb) * strength
+
+
+def _map_colors(np, rgb, pairs):
+    # Pixels near a `from` color are shifted by (to - from), which keeps
+    # anti-aliased edges and shading of that color intact
+    out = rgb.copy()
+    taken = np.zeros(rgb.shape[:2], dtype=bool)
+    for src, dst in pairs:
+        src = np.array(src, dtype=np.float32)
+        near = (((rgb - src) ** 2).sum(axis=-1) <= MAP_TOLERANCE ** 2) & ~taken
+        out[near] += np.array(dst, dtype=np.float32) - src
+        taken |= near
+    return out
+
+
+def variant_path(src_png, variant, out_dir=VARIANT_DIR):
+    return Path(out_dir) / f"{Path(src_png).stem}-{variant.slug}.png"
+
+
+def _write(image, dest):
+    # Private temp name + rename, as for renders: readers never see half a PNG
+    tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        image.save(tmp_path, "PNG")
+        os.replace(tmp_path, dest)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def recolor_many(jobs, out_dir=VARIANT_DIR):
+    """
+    Produce every (src_png, variant) in jobs, skipping cached ones and
+    decoding each source PNG once however many variants it gets. Returns a
+    list of (variant png path, error) in job order, error being None on
+    success.
+    """
+    from PIL import Image
+
+    np = _numpy()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    results = [None] * len(jobs)
+    by_source = {}
+    for i, (src_png, variant) in enumerate(jobs):
+        dest = variant_path(src_png, variant, out_dir)
+        if dest.exists():
+            tracer.count("recolor.hit")
+            results[i] = (dest, None)
+        else:
+            by_source.setdefault(str(src_png), []).append((i, variant, dest))
+
+    for src_png, pending in by_source.items():
+        try:
+            with Image.open(src_png) as image:
+                rgba = np.asarray(image.convert("RGBA"))
+        except Exception as e:
+            tracer.failure("recolor", src_png, e)
+            for i, _, dest in pending:
+                results[i] = (dest, str(e))
+            continue
+        for i, variant, dest in pending:
+            tracer.count("recolor.miss")
+            try:
+                with tracer.span("recolor", variant=variant.key):
+                    _write(Image.fromarray(variant.apply(rgba), "RGBA"), dest)
+                results[i] = (dest, None)
+            except Exception as e:
+                tracer.failure("recolor", dest, e)
+                results[i] = (dest, str(e))
+    return results
+
+
+def recolor(src_png, variant, out_dir=VARIANT_DIR):
+    """ Path of src_png recolored with variant, producing it on a cache miss. """
+    dest, error = recolor_many([(src_png, variant)], out_dir)[0]
+    if error:
+        raise RuntimeError(error)
+    return dest
+
@@ -0,0 +1,183 @@
+import os
+import time
+from pathlib import Path
+
+from .atlas import ATLAS_NAME, update_atlas
+from .cache import RenderCache
+from .config import CONVERTED_SIZES, PREVIEW_SIZE
+from .rasterizers import ensure_selected
+from .rasterizers import render as rasterize
+from .trace import tracer
+
+
+def render_svg(svg_path, png_path, size):
+    # The rasterizer chain (and whatever it imports, e.g. cairosvg) is set up
+    # on the first render, so callers that only read the cache don't pay for it.
+    return rasterize(svg_path, png_path, size)
+
+
+def render_timed(job):
+    """
+    Render one (svg_path, png_path, size) job and return (svg_path, error,
+    start, seconds). Runs inside pool workers, so it records nothing itself:
+    start is perf_counter(), a system-wide monotonic clock the parent can
+    put on its own timeline.
+    """
+    svg_path, png_path, size = job
+    png_path = Path(png_path)
+    # Write to a private temp file and rename, so a half-written PNG is never
+    # visible to the GUI or to another worker rendering the same icon.
+    tmp_path = png_path.with_name(f".{png_path.name}.{os.getpid()}.tmp")
+    start = time.perf_counter()
+    try:
+        render_svg(svg_path, tmp_path, size)
+        os.replace(tmp_path, png_path)
+        error = None
+    except Exception as e:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        error = str(e)
+    return str(svg_path), error, start, time.perf_counter() - start
+
+
+def _record(job, result):
+    svg_path, error, start, seconds = result
+    tracer.add_span("rasterize", start, seconds, icon=Path(svg_path).name, size=job[2])
+    if error:
+        tracer.failure("rasterize", svg_path, error)
+    return svg_path, error
+
+
+def render_job(job):
+    """ Render one (svg_path, png_path, size) job in this process; returns (svg_path, error). """
+    return _record(job, render_timed(job))
+
+
+class RenderEngine:
+    """ Rasterizes SVGs on a process pool so a cold cache is filled across all cores. """
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn rather than fork: the GUI process runs Tk and several threads,
+            # neither of which survives a fork safely.
+            ctx = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        return self._pool
+
+    def render_many(self, jobs, chunksize=8):
+        """ Yield (svg_path, error) for every job, error being None on success. """
+        jobs = list(jobs)
+        if not jobs:
+            return
+        if self.workers == 1 or len(jobs) == 1:
+            for job in jobs:
+                yield render_job(job)
+            return
+        # Spans are recorded here from the workers' timings: a worker's own
+        # tracer is never exported
+        for job, result in zip(jobs, self._get_pool().map(render_timed, jobs, chunksize=chunksize)):
+            tracer.count("rasterize.pool")
+            yield _record(job, result)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def render_sizes(svg_paths, cache, sizes=CONVERTED_SIZES, workers=None):
+    """
+    Render every (svg, size) combination missing from cache, in parallel on a
+    process pool, and record the results. Sizes already cached cost nothing,
+    so the set fills in lazily as icons get used. Returns {str(svg_path):
+    error} for the renders that failed.
+    """
+    jobs = []
+    for svg_path in svg_paths:
+        for size in sizes:
+            # Checked on disk: these are the files applied icons point at
+            if cache.lookup(svg_path, size, check=True) is None:
+                jobs.append((svg_path, cache.path_for(svg_path, size), size))
+    errors = {}
+    if not jobs:
+        return errors
+    engine = RenderEngine(workers)
+    try:
+        for job, (svg_path, error) in zip(jobs, engine.render_many(jobs)):
+            if error:
+                errors[svg_path] = error
+            else:
+                cache.record(Path(svg_path), job[2])
+    finally:
+        engine.shutdown()
+        cache.save()
+    return errors
+
+
+def preview_jobs(svg_paths, cache, size=PREVIEW_SIZE):
+    """ Build render jobs for every SVG with no render at size in cache yet. """
+    jobs = []
+    for svg_path in svg_paths:
+        if cache.lookup(svg_path, size) is None:
+            jobs.append((svg_path, cache.path_for(svg_path, size), size))
+    return jobs
+
+
+def prewarm(icon_dir, preview_dir, size=PREVIEW_SIZE, workers=None, progress=None):
+    """
+    Fill preview_dir with thumbnails for every SVG in icon_dir (or, if None,
+    in the catalog of all icon directories) and pack them into the preview
+    atlas.
+    progress, if given, is called as progress(done, total) after each icon.
+    Returns a stats dict including the render rate in icons per second.
+    """
+    cache = RenderCache(preview_dir).load()
+    if icon_dir is None:
+        from .catalog import default_catalog
+        svg_paths = default_catalog().paths()
+    else:
+        svg_paths = sorted(Path(icon_dir).glob("*.svg"))
+    cache.refresh_sources(svg_paths)
+    jobs = preview_jobs(svg_paths, cache, size)
+    if jobs:
+        # Benchmark before spawning workers, so they all read the same choice
+        ensure_selected()
+
+    engine = RenderEngine(workers)
+    failed = []
+    start = time.perf_counter()
+    try:
+        for done, (svg_path, error) in enumerate(engine.render_many(jobs), 1):
+            if error:
+                failed.append((svg_path, error))
+            else:
+                cache.record(svg_path, size)
+            if progress:
+                progress(done, len(jobs))
+        atlas = update_atlas(Path(preview_dir) / ATLAS_NAME, cache, svg_paths, size)
+    finally:
+        engine.shutdown()
+        cache.evict_orphans()
+        cache.save()
+    elapsed = time.perf_counter() - start
+
+    rendered = len(jobs) - len(failed)
+    return {
+        "total": len(svg_paths),
+        "cached": len(svg_paths) - len(jobs),
+        "rendered": rendered,
+        "failed": failed,
+        "atlas_tiles": len(atlas),
+        "workers": engine.workers,
+        "seconds": elapsed,
+        "icons_per_second": rendered / elapsed if elapsed > 0 else 0.0,
+    }
@@ -0,0 +1,158 @@
+import json
+import os
+from pathlib import Path
+
+from .aliases import EXTENSION_ALIASES, FILENAME_ALIASES, FOLDER_ALIASES
+from .config import USER_ALIASES_PATH
+
+LIGHT_SUFFIX = "_light"
+OPEN_SUFFIX = "-open"
+
+
+def split_variant(stem):
+    """ "folder-src-open_light" -> ("folder-src", opened=True, light=True) """
+    light = stem.endswith(LIGHT_SUFFIX)
+    if light:
+        stem = stem[:-len(LIGHT_SUFFIX)]
+    opened = stem.endswith(OPEN_SUFFIX)
+    if opened:
+        stem = stem[:-len(OPEN_SUFFIX)]
+    return stem, opened, light
+
+
+def other_number(name):
+    """
+    "tests" -> "test", "doc" -> "docs", or None where a trailing 's' isn't a
+    plural ("css", "sass") or the stem is too short to tell ("cs", "os").
+    """
+    if name.endswith(("ss", "us", "is")):
+        return None
+    singular = name[:-1] if name.endswith("s") else name
+    if len(singular) < 3:
+        return None
+    return singular if singular != name else name + "s"
+
+
+def load_user_aliases(path=USER_ALIASES_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+class IconResolver:
+    """
+    Maps file and folder names to icons through indexes built once:
+    exact file names, extensions (compound ones like "d.ts" and "tar.gz"
+    first), and folder names. Every lookup is a handful of dict hits, and
+    repeated names are memoized, which matters when resolving whole trees.
+    """
+
+    def __init__(self, svg_paths, user_aliases=None):
+        self.variants = {}  # base stem -> {(opened, light): path}
+        for svg_path in svg_paths:
+            base, opened, light = split_variant(svg_path.stem)
+            self.variants.setdefault(base, {})[(opened, light)] = svg_path
+        self.icons = {base: v.get((False, False)) or next(iter(v.values())) for base, v in self.variants.items()}
+
+        user_aliases = user_aliases or {}
+        file_stems = [s for s in self.icons if not s.startswith("folder-")]
+
+        self.extensions = {}
+        # Most extensions name their icon directly ("json" -> json.svg)
+        for stem in file_stems:
+            self.extensions[stem] = stem
+        self._add(self.extensions, EXTENSION_ALIASES)
+        self._add(self.extensions, user_aliases.get("extensions", {}))
+        self.max_ext_parts = max((e.count(".") + 1 for e in self.extensions), default=1)
+
+        self.filenames = {}
+        self._add(self.filenames, FILENAME_ALIASES)
+        self._add(self.filenames, user_aliases.get("filenames", {}))
+
+        self.folders = {}
+        for stem in self.icons:
+            if stem.startswith("folder-"):
+                # Singular and plural forms ("test" / "tests", "docs" / "doc")
+                other = other_number(stem[len("folder-"):])
+                if other is not None:
+                    self.folders.setdefault(other, stem)
+        for stem in self.icons:
+            if stem.startswith("folder-"):
+                self.folders[stem[len("folder-"):]] = stem
+        self._add(self.folders, {k: f"folder-{v}" for k, v in FOLDER_ALIASES.items()})
+        self._add(self.folders, {k: v if v.startswith("folder-") else f"folder-{v}" for k, v in user_aliases.get("folders", {}).items()})
+
+        self._memo = {}
+
+    def _add(self, index, aliases):
+        for key, icon_name in aliases.items():
+            if icon_name in self.icons:
+                index[key.lower()] = icon_name
+
+    @classmethod
+    def from_dir(cls, icon_dir=None, user_aliases_path=USER_ALIASES_PATH):
+        """ Resolver over icon_dir, or over the catalog of all icon directories if None. """
+        if icon_dir is None:
+            from .catalog import default_catalog
+            svg_paths = default_catalog().paths()
+        else:
+            svg_paths = sorted(Path(icon_dir).glob("*.svg"))
+        return cls(svg_paths, load_user_aliases(user_aliases_path))
+
+    def icon(self, name):
+        """ SVG path of a base icon name, or None. """
+        return self.icons.get(name)
+
+    def resolve_name(self, name, is_dir):
+        """ Icon for a bare file or directory name, or None. """
+        key = (name, is_dir)
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+
+        lower = name.lower()
+        stem = None
+        if is_dir:
+            stem = self.folders.get(lower) or self.folders.get(lower.lstrip("._"))
+        else:
+            stem = self.filenames.get(lower)
+            if stem is None:
+                # Longest (compound) extension first: "a.d.ts" tries "d.ts", then "ts"
+                parts = lower.lstrip(".").split(".")
+                for n in range(min(self.max_ext_parts, len(parts) - 1), 0, -1):
+                    stem = self.extensions.get(".".join(parts[-n:]))
+                    if stem is not None:
+                        break
+
+        result = self.icons.get(stem) if stem else None
+        self._memo[key] = result
+        return result
+
+    def resolve(self, path, is_dir=None):
+        if is_dir is None:
+            is_dir = os.path.isdir(path)
+        return self.resolve_name(os.path.basename(os.fspath(path).rstrip(os.sep)), is_dir)
+
+    def resolve_many(self, paths, is_dir=None):
+        """
+        Resolve many paths at once. `paths` holds plain paths (is_dir then
+        applies to all of them, or None to check the filesystem) or
+        (path, is_dir) pairs. Returns a list of SVG paths / None in order.
+        """
+        resolve_name = self.resolve_name
+        basename = os.path.basename
+        results = []
+        for item in paths:
+            if isinstance(item, tuple):
+                path, item_is_dir = item
+            else:
+                path, item_is_dir = item, is_dir
+            path = os.fspath(path)
+            if item_is_dir is None:
+                item_is_dir = os.path.isdir(path)
+            results.append(resolve_name(basename(path.rstrip(os.sep)), item_is_dir))
+        return results
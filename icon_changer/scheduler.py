@@ -0,0 +1,123 @@
+import heapq
+import itertools
+import threading
+
+from .trace import tracer
+
+# Lower runs first
+VISIBLE = 0
+PREFETCH = 1
+
+
+class RenderScheduler:
+    """
+    One bounded pool of worker threads fed by a priority queue.
+
+    Requests are keyed (by SVG path): asking again for a queued key only
+    raises its priority and adds the new target, and asking for a key that
+    is being loaded just waits for that result. cancel_all() empties the
+    queue and bumps a generation number, so anything still in flight when it
+    finishes is dropped instead of delivered.
+
+    load(key) runs on a worker and returns the result (or None on failure);
+    deliver(key, result, targets, generation) is then called on that worker.
+    """
+
+    def __init__(self, load, deliver, workers=2):
+        self.load = load
+        self.deliver = deliver
+        self.workers = max(1, workers)
+        self.generation = 0
+
+        self._cond = threading.Condition()
+        self._heap = []  # (priority, seq, key, generation)
+        self._queued = {}  # key -> [priority, targets]
+        self._in_flight = {}  # key -> targets waiting on the running load
+        self._seq = itertools.count()
+        self._threads = []
+        self._closed = False
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._worker, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, key, priority=VISIBLE, target=None):
+        """ Queue key for loading; target (if any) is handed back on delivery. """
+        with self._cond:
+            if self._closed:
+                return
+            if key in self._in_flight:
+                if target is not None:
+                    self._in_flight[key].append(target)
+                return
+            entry = self._queued.get(key)
+            if entry is None:
+                entry = self._queued[key] = [priority, []]
+                heapq.heappush(self._heap, (priority, next(self._seq), key, self.generation))
+            elif priority < entry[0]:
+                # Old heap entry becomes stale and is skipped when popped
+                entry[0] = priority
+                heapq.heappush(self._heap, (priority, next(self._seq), key, self.generation))
+            if target is not None:
+                entry[1].append(target)
+            self._start_workers()
+            self._cond.notify()
+
+    def discard(self, key):
+        """ Drop a queued request that nobody needs any more (e.g. scrolled away). """
+        with self._cond:
+            self._queued.pop(key, None)
+
+    def cancel_all(self):
+        """ Forget every queued request; results of in-flight ones are not delivered. """
+        with self._cond:
+            self.generation += 1
+            self._heap.clear()
+            self._queued.clear()
+            self._in_flight.clear()
+
+    def pending(self):
+        with self._cond:
+            return len(self._queued) + len(self._in_flight)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._heap.clear()
+            self._queued.clear()
+            self._cond.notify_all()
+
+    def _next(self):
+        # Called with the condition held; returns (key, generation) or None on shutdown
+        while True:
+            while not self._heap and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            priority, _, key, generation = heapq.heappop(self._heap)
+            entry = self._queued.get(key)
+            if generation != self.generation or entry is None or entry[0] != priority:
+                continue  # stale: cancelled, discarded or re-prioritized
+            del self._queued[key]
+            self._in_flight[key] = entry[1]
+            return key, generation
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next()
+            if job is None:
+                return
+            key, generation = job
+            try:
+                result = self.load(key)
+            except Exception as e:
+                tracer.failure("load", key, e)
+                result = None
+            with self._cond:
+                current = generation == self.generation
+                targets = self._in_flight.pop(key, []) if current else []
+            if current:
+                self.deliver(key, result, targets, generation)
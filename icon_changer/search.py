@@ -0,0 +1,153 @@
+import bisect
+import re
+import time
+from collections import deque
+
+# Ranking tiers, best first
+EXACT, ALIAS_EXACT, PREFIX, WORD_PREFIX, SUBSTRING, ALIAS_PREFIX, FUZZY = range(7)
+# Shorter queries match nearly everything as a subsequence, so they are substring-only
+MIN_FUZZY_QUERY = 3
+
+_WORD_SPLIT = re.compile(r"[-_.]")
+
+
+def _is_subsequence(query, text):
+    it = iter(text)
+    return all(ch in it for ch in query)
+
+
+def _fuzzy_gaps(query, text):
+    # Total number of skipped characters between matched ones; lower is tighter.
+    gaps = 0
+    pos = text.find(query[0])
+    for ch in query[1:]:
+        nxt = text.find(ch, pos + 1)
+        gaps += nxt - pos - 1
+        pos = nxt
+    return gaps
+
+
+class IconSearchIndex:
+    """
+    Lowercase name index over one list of icons, built once after discovery.
+
+    Candidates come from an n-gram index (every 1-2 character substring of
+    each stem) and a sorted alias table, so no query scans all icons. Results
+    are ranked exact > alias > prefix > word prefix > substring > fuzzy. When a
+    query extends the previous one, only the previous matches are re-checked,
+    since anything matching "pyt" also matched "py".
+    """
+
+    def __init__(self, svg_paths, aliases=None):
+        self.paths = list(svg_paths)
+        self.stems = [p.stem.lower() for p in self.paths]
+        # Folder icons are searched by the part after "folder-" too
+        self.names = [s[len("folder-"):] if s.startswith("folder-") else s for s in self.stems]
+        self.words = [_WORD_SPLIT.split(n) for n in self.names]
+
+        self._grams = {}
+        for i, stem in enumerate(self.stems):
+            for n in (1, 2):
+                for j in range(len(stem) - n + 1):
+                    self._grams.setdefault(stem[j:j + n], set()).add(i)
+
+        by_stem = {stem: i for i, stem in enumerate(self.stems)}
+        self._alias_terms = {}  # icon index -> [alias terms]
+        alias_table = []
+        for icon_name, terms in (aliases or {}).items():
+            i = by_stem.get(icon_name.lower())
+            if i is None:
+                continue
+            for term in terms:
+                term = term.lower()
+                self._alias_terms.setdefault(i, []).append(term)
+                alias_table.append((term, i))
+        alias_table.sort()
+        self._alias_keys = [t for t, _ in alias_table]
+        self._alias_ids = [i for _, i in alias_table]
+
+        self._last_query = None
+        self._last_ids = None
+        self.latencies = deque(maxlen=256)  # (query, milliseconds, narrowed)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _alias_prefix_ids(self, query):
+        lo = bisect.bisect_left(self._alias_keys, query)
+        hi = bisect.bisect_left(self._alias_keys, query + "\uffff")
+        return set(self._alias_ids[lo:hi])
+
+    def _candidates(self, query):
+        if len(query) < MIN_FUZZY_QUERY:
+            # Short queries are substring-only: the gram set is the exact answer
+            ids = set(self._grams.get(query, ()))
+        else:
+            # Fuzzy matches only need every character to be present somewhere
+            char_sets = [self._grams.get(ch, set()) for ch in set(query)]
+            ids = set.intersection(*sorted(char_sets, key=len))
+        return ids | self._alias_prefix_ids(query)
+
+    def _rank(self, query, i):
+        stem, name = self.stems[i], self.names[i]
+        terms = self._alias_terms.get(i, ())
+        if stem == query or name == query:
+            return EXACT
+        if query in terms:
+            return ALIAS_EXACT
+        if name.startswith(query) or stem.startswith(query):
+            return PREFIX
+        if any(w.startswith(query) for w in self.words[i]):
+            return WORD_PREFIX
+        if query in stem:
+            return SUBSTRING
+        if any(t.startswith(query) for t in terms):
+            return ALIAS_PREFIX
+        if len(query) >= MIN_FUZZY_QUERY and _is_subsequence(query, name):
+            return FUZZY
+        return None
+
+    def _sort_key(self, query, tier, i):
+        name = self.names[i]
+        fuzz = _fuzzy_gaps(query, name) if tier == FUZZY else 0
+        return (tier, fuzz, len(name), name)
+
+    def search(self, query):
+        """ Ranked list of icon paths matching query; all icons for an empty query. """
+        start = time.perf_counter()
+        query = query.strip().lower()
+        if not query:
+            self._last_query = self._last_ids = None
+            return list(self.paths)
+
+        # Short queries keep no fuzzy matches, so they can't seed a fuzzy one
+        narrowed = (
+            self._last_query is not None
+            and query.startswith(self._last_query)
+            and (len(self._last_query) >= MIN_FUZZY_QUERY or len(query) < MIN_FUZZY_QUERY)
+        )
+        pool = self._last_ids if narrowed else self._candidates(query)
+
+        ranked = []
+        for i in pool:
+            tier = self._rank(query, i)
+            if tier is not None:
+                ranked.append((self._sort_key(query, tier, i), i))
+        ranked.sort()
+
+        self._last_query = query
+        self._last_ids = {i for _, i in ranked}
+        self.latencies.append((query, (time.perf_counter() - start) * 1000, narrowed))
+        return [self.paths[i] for _, i in ranked]
+
+    def latency_summary(self):
+        """ count / mean / p95 / max of recent per-query latencies in milliseconds. """
+        samples = sorted(ms for _, ms, _ in self.latencies)
+        if not samples:
+            return {"count": 0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        return {
+            "count": len(samples),
+            "mean_ms": sum(samples) / len(samples),
+            "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            "max_ms": samples[-1],
+        }
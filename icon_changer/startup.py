@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+import time
+
+
+def process_age():
+    """ Seconds since this process was started, from /proc on Linux; None elsewhere. """
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            # Field 22 (starttime, in clock ticks since boot) comes after the
+            # parenthesised command name, which may itself contain spaces.
+            fields = f.read().rsplit(b")", 1)[1].split()
+        start_ticks = int(fields[19])
+        with open("/proc/uptime", "rb") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfile:
+    """
+    Named timestamps relative to the first line of the app, for the
+    --startup-profile report. Only the first mark of each name counts.
+    """
+
+    def __init__(self, origin=None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        age = process_age()
+        # Interpreter startup and anything before `origin` was taken
+        self.pre_origin = None if age is None else max(0.0, age - (time.perf_counter() - self.origin))
+        self.marks = []
+        self._seen = set()
+
+    def mark(self, name):
+        if name not in self._seen:
+            self._seen.add(name)
+            self.marks.append((name, time.perf_counter() - self.origin))
+
+    def elapsed(self, name):
+        for mark_name, t in self.marks:
+            if mark_name == name:
+                return t
+        return None
+
+    def as_dict(self):
+        return {
+            "pre_origin_ms": None if self.pre_origin is None else self.pre_origin * 1000,
+            "marks_ms": {name: t * 1000 for name, t in self.marks},
+            "modules_loaded": sorted(m for m in ("cairosvg", "customtkinter", "PIL", "packaging", "urllib.request", "webbrowser") if m in sys.modules),
+        }
+
+    def report(self):
+        lines = ["Startup profile (ms since app start):"]
+        if self.pre_origin is not None:
+            lines.append(f"  {'interpreter startup':32} {-self.pre_origin * 1000:9.1f}")
+        previous = 0.0
+        for name, t in self.marks:
+            lines.append(f"  {name:32} {t * 1000:9.1f}  (+{(t - previous) * 1000:.1f})")
+            previous = t
+        lines.append(f"  modules loaded: {', '.join(self.as_dict()['modules_loaded'])}")
+        return "\n".join(lines)
+
+    def write(self, destination):
+        """ Print the report ("-") or write it as JSON to a file path. """
+        if destination == "-":
+            print(self.report())
+        else:
+            with open(destination, "w", encoding="utf-8") as f:
+                json.dump(self.as_dict(), f, indent=2)
@@ -0,0 +1,89 @@
+"""
+Install converted icons into the user's hicolor icon theme, so targets can
+reference them by name (metadata::custom-icon-name) instead of by a path into
+the render cache. The file manager then looks them up through its own icon
+cache, and clearing ~/.cache doesn't break anything.
+"""
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+from .config import CONVERTED_SIZES, ICON_THEME_DIR
+from .render import render_sizes
+
+THEME_PREFIX = "folder-icon-changer-"
+# hicolor's index.theme lists <size>x<size>/places for every size we render
+CONTEXT = "places"
+
+
+def themed_name(svg_path):
+    return THEME_PREFIX + Path(svg_path).stem
+
+
+def theme_path(name, size, theme_dir=ICON_THEME_DIR):
+    return Path(theme_dir) / f"{size}x{size}" / CONTEXT / f"{name}.png"
+
+
+def _up_to_date(src, dest):
+    try:
+        s, d = src.stat(), dest.stat()
+    except OSError:
+        return False
+    return s.st_size == d.st_size and d.st_mtime_ns >= s.st_mtime_ns
+
+
+def refresh_icon_cache(theme_dir=ICON_THEME_DIR):
+    """
+    Rebuild the theme's icon-theme.cache once. Without the tool, bumping the
+    directory mtime still tells GTK its existing cache is stale.
+    Returns True if a cache was built.
+    """
+    theme_dir = Path(theme_dir)
+    try:
+        os.utime(theme_dir, None)
+    except OSError:
+        pass
+    for tool in ("gtk-update-icon-cache", "gtk4-update-icon-cache"):
+        if shutil.which(tool):
+            # -t: the user-level hicolor dir has no index.theme of its own
+            result = subprocess.run([tool, "-f", "-t", "-q", str(theme_dir)], capture_output=True)
+            return result.returncode == 0
+    return False
+
+
+def install_icons(svg_paths, cache, sizes=CONVERTED_SIZES, theme_dir=ICON_THEME_DIR, workers=None, refresh=True):
+    """
+    Render svg_paths at every size (in parallel, cached) and copy them into
+    the theme. Files already installed and current are left alone, and the
+    icon cache is refreshed once, only if something changed (and refresh is
+    True). Returns ({str(svg_path): icon_name}, {str(svg_path): error}).
+    """
+    svg_paths = list(dict.fromkeys(Path(p) for p in svg_paths))
+    errors = render_sizes(svg_paths, cache, sizes, workers)
+
+    names = {}
+    changed = False
+    for svg_path in svg_paths:
+        if str(svg_path) in errors:
+            continue
+        name = themed_name(svg_path)
+        try:
+            for size in sizes:
+                src = cache.path_for(svg_path, size)
+                dest = theme_path(name, size, theme_dir)
+                if _up_to_date(src, dest):
+                    continue
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                tmp = dest.with_name(f".{dest.name}.tmp")
+                shutil.copyfile(src, tmp)
+                os.replace(tmp, dest)
+                changed = True
+        except OSError as e:
+            errors[str(svg_path)] = f"Install failed: {e}"
+            continue
+        names[str(svg_path)] = name
+
+    if changed and refresh:
+        refresh_icon_cache(theme_dir)
+    return names, errors
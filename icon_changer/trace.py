@@ -0,0 +1,109 @@
+"""
+Lightweight instrumentation for the hot paths: timing spans, counters and
+recorded failures. Counters and per-span totals are always kept (a dict
+update each); individual span events are only recorded once tracing is
+enabled, and can then be exported in Chrome's trace format (load the file in
+chrome://tracing or https://ui.perfetto.dev).
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Enough for a few minutes of scrolling; older events are dropped first
+MAX_EVENTS = 200000
+MAX_FAILURES = 500
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.counters = Counter()
+        self.spans = {}  # name -> [count, total seconds, max seconds]
+        self.events = deque(maxlen=MAX_EVENTS)  # (name, start, duration, thread id, args)
+        self.failures = deque(maxlen=MAX_FAILURES)  # (time, kind, subject, error)
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def failure(self, kind, subject, error):
+        """ Count a failure and keep it for the report instead of dropping it. """
+        with self._lock:
+            self.counters[f"failed.{kind}"] += 1
+            self.failures.append((time.perf_counter() - self.origin, kind, str(subject), str(error)))
+
+    def add_span(self, name, start, duration, **args):
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                span = self.spans[name] = [0, 0.0, 0.0]
+            span[0] += 1
+            span[1] += duration
+            if duration > span[2]:
+                span[2] = duration
+            if self.enabled:
+                self.events.append((name, start - self.origin, duration, threading.get_ident(), args))
+
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.perf_counter() - start, **args)
+
+    def stats(self):
+        """ Counters, span totals and recent failures as a JSON-ready dict. """
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "spans": {
+                    name: {"count": n, "total_ms": total * 1000, "mean_ms": total / n * 1000, "max_ms": longest * 1000}
+                    for name, (n, total, longest) in sorted(self.spans.items())
+                },
+                "failures": [
+                    {"t_ms": t * 1000, "kind": kind, "subject": subject, "error": error}
+                    for t, kind, subject, error in self.failures
+                ],
+            }
+
+    def summary_lines(self):
+        """ Short human-readable summary, slowest spans first. """
+        stats = self.stats()
+        lines = []
+        for name, s in sorted(stats["spans"].items(), key=lambda item: -item[1]["total_ms"]):
+            lines.append(f"{name:22} {s['count']:7}x  {s['mean_ms']:8.2f} ms avg  {s['max_ms']:8.2f} ms max")
+        for name, n in sorted(stats["counters"].items()):
+            lines.append(f"{name:22} {n:7}")
+        for f in stats["failures"][-10:]:
+            lines.append(f"FAIL {f['kind']}: {f['subject']}: {f['error']}")
+        return lines
+
+    def write(self, destination):
+        """
+        Write a Chrome trace (complete "X" events) with the stats() summary
+        alongside, as JSON.
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        trace = [
+            {
+                "name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                "ts": start * 1e6, "dur": duration * 1e6, "args": args,
+            }
+            for name, start, duration, tid, args in events
+        ]
+        with open(destination, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms", "stats": self.stats()}, f)
+
+
+tracer = Tracer()
@@ -0,0 +1,176 @@
+"""
+Recursive auto-iconizer: walk a directory tree as a stream, match folder
+names to folder-* icons and files to file icons, and apply the matches in
+batches through the metadata backend.
+"""
+import fnmatch
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from .cache import RenderCache
+from .config import CONVERTED_DIR, CONVERTED_SIZE
+from .core import best_size, converted_png, icon_label
+from .metadata import CUSTOM_ICON, CUSTOM_ICON_NAME, get_backend
+from .recolor import recolor
+from .resolver import IconResolver
+from .theme import install_icons, refresh_icon_cache
+from .trace import tracer
+
+DEFAULT_IGNORES = (".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", ".tox", ".cache")
+
+
+def walk(root, max_depth=None, ignore=DEFAULT_IGNORES, include_files=True):
+    """
+    Yield (path, is_dir) for everything below root, depth-first, using
+    os.scandir so file types come from the directory listing rather than a
+    stat per entry. Symlinks are not followed. Ignored names (exact or glob)
+    are skipped along with everything beneath them.
+    """
+    exact = {p for p in ignore if not any(c in p for c in "*?[")}
+    patterns = [p for p in ignore if p not in exact]
+
+    stack = [(os.fspath(root), 1)]
+    while stack:
+        path, depth = stack.pop()
+        try:
+            it = os.scandir(path)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                name = entry.name
+                if name in exact or any(fnmatch.fnmatch(name, p) for p in patterns):
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if is_dir:
+                    yield entry.path, True
+                    if max_depth is None or depth < max_depth:
+                        stack.append((entry.path, depth + 1))
+                elif include_files:
+                    yield entry.path, False
+
+
+def _chunks(iterable, size):
+    """ Lists of up to size items from iterable, as it streams. """
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def auto_iconize(root, max_depth=None, ignore=DEFAULT_IGNORES, include_files=True, dry_run=False,
+                 workers=4, batch_size=512, backend=None, resolver=None, report=None, size=CONVERTED_SIZE, themed=False,
+                 variant=None, journal=None):
+    """
+    Walk root and apply every match. Metadata is written in batches of
+    batch_size with at most `workers` batches in flight, while the walk keeps
+    streaming. With dry_run nothing is rendered or written; report, if given,
+    is called as report(path, icon_name) for each match either way. Icons
+    are rendered at the best size for `size` (see core.best_size), or with
+    themed installed into the user icon theme and referenced by name.
+    variant, if given, recolors every applied icon (see recolor.py). Each
+    written batch is recorded in journal, if given, in one transaction.
+    Returns a stats dict.
+    """
+    if themed and variant is not None:
+        raise ValueError("Color variants can't be installed into the icon theme")
+    resolver = resolver or IconResolver.from_dir()
+    if not dry_run:
+        backend = backend or get_backend(workers=workers)
+        cache = RenderCache(CONVERTED_DIR).load()
+        size = best_size(size)
+    values = {}  # svg path -> metadata value, rendered once per distinct icon
+    labels = {}  # metadata value -> journal label
+
+    scanned = 0
+    per_icon = Counter()
+    failed = []
+    lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(max(1, workers))
+
+    def flush(batch):
+        # Runs on the pool, whose futures nobody waits on: anything raised
+        # here must end up in `failed` rather than vanish
+        errors = None
+        try:
+            errors = backend.write_many(batch, CUSTOM_ICON_NAME if themed else CUSTOM_ICON)
+            if themed:
+                backend.write_many([(t, None) for (t, _), e in zip(batch, errors) if e is None])
+            if journal is not None:
+                journal.record_many((t, labels[v], size, themed, v) for (t, v), e in zip(batch, errors) if e is None)
+        except Exception as e:
+            tracer.failure("apply.batch", f"{len(batch)} targets", e)
+            errors = [error or str(e) for error in errors] if errors is not None else [str(e)] * len(batch)
+        finally:
+            if errors is not None:
+                with lock:
+                    failed.extend((target, e) for (target, _), e in zip(batch, errors) if e)
+            in_flight.release()
+
+    start = time.perf_counter()
+    batch = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # Resolved a chunk of the stream at a time (names are memoized across chunks)
+        for chunk in _chunks(walk(root, max_depth, ignore, include_files), batch_size):
+            scanned += len(chunk)
+            for (path, is_dir), svg_path in zip(chunk, resolver.resolve_many(chunk)):
+                if svg_path is None:
+                    continue
+                per_icon[svg_path.stem] += 1
+                if report:
+                    report(path, svg_path.stem)
+                if dry_run:
+                    continue
+
+                value = values.get(svg_path)
+                if value is None:
+                    try:
+                        if themed:
+                            # The icon cache is refreshed once, after the walk
+                            names, errors = install_icons([svg_path], cache, workers=1, refresh=False)
+                            if errors:
+                                raise RuntimeError(errors[str(svg_path)])
+                            value = values[svg_path] = names[str(svg_path)]
+                        else:
+                            png_path = converted_png(svg_path, cache, size)
+                            if variant is not None:
+                                png_path = recolor(png_path, variant)
+                            value = values[svg_path] = f"file://{png_path}"
+                        labels[value] = icon_label(svg_path, variant)
+                    except Exception as e:
+                        with lock:
+                            failed.append((path, f"Render failed: {e}"))
+                        continue
+                batch.append((path, value))
+                if len(batch) >= batch_size:
+                    in_flight.acquire()
+                    pool.submit(flush, batch)
+                    batch = []
+
+        if batch:
+            in_flight.acquire()
+            pool.submit(flush, batch)
+    if themed and values:
+        refresh_icon_cache()
+    elapsed = time.perf_counter() - start
+
+    matched = sum(per_icon.values())
+    return {
+        "scanned": scanned,
+        "matched": matched,
+        "applied": 0 if dry_run else matched - len(failed),
+        "failed": failed,
+        "per_icon": per_icon,
+        "seconds": elapsed,
+        "entries_per_second": scanned / elapsed if elapsed > 0 else 0.0,
+        "dry_run": dry_run,
+    }
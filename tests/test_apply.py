@@ -0,0 +1,190 @@
+"""
+The apply path against FakeBackend: no desktop session, and no SVG
+rasterizer either, since every render the tests need is put in the cache
+up front.
+"""
+import shutil
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from icon_changer import catalog, tree
+from icon_changer.cache import RenderCache
+from icon_changer.core import apply_many, reset_icon
+from icon_changer.journal import Journal
+from icon_changer.metadata import CUSTOM_ICON, CUSTOM_ICON_NAME, FakeBackend
+from icon_changer.resolver import IconResolver
+
+BUNDLED_ICONS = Path(__file__).resolve().parent.parent / "icons"
+ICONS = ("python", "folder-src", "folder-test")
+SIZE = 256
+
+
+@pytest.fixture
+def icon_dir(tmp_path, monkeypatch):
+    icon_dir = tmp_path / "icons"
+    icon_dir.mkdir()
+    for name in ICONS:
+        shutil.copy(BUNDLED_ICONS / f"{name}.svg", icon_dir)
+    # Journal labels look icons up in the default catalog; keep it (and its
+    # snapshot) out of the user's directories
+    monkeypatch.setattr(catalog, "_default_catalog", catalog.Catalog([icon_dir], tmp_path / "catalog.json").load())
+    catalog._default_catalog.refresh()
+    return icon_dir
+
+
+@pytest.fixture
+def cache(tmp_path, icon_dir, monkeypatch):
+    # Every icon is already "rendered", so nothing needs a rasterizer
+    cache = RenderCache(tmp_path / "converted").load()
+    for svg_path in icon_dir.glob("*.svg"):
+        Image.new("RGBA", (SIZE, SIZE), (255, 0, 0, 255)).save(cache.path_for(svg_path, SIZE))
+        cache.record(svg_path, SIZE)
+    cache.save()
+    # auto_iconize opens the converted cache itself
+    monkeypatch.setattr(tree, "CONVERTED_DIR", cache.root)
+    return cache
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = Journal(tmp_path / "journal.sqlite3")
+    yield journal
+    journal.close()
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    for name in ("src", "test", "docs"):
+        (root / name).mkdir(parents=True)
+    (root / "main.py").write_text("print()\n")
+    return root
+
+
+def uri(cache, icon_dir, name):
+    return f"file://{cache.path_for(icon_dir / f'{name}.svg', SIZE)}"
+
+
+def test_apply_many_writes_every_target(icon_dir, cache, project):
+    backend = FakeBackend()
+    pairs = [(project / "src", "folder-src"), (project / "main.py", "python"), (project / "test", "folder-src")]
+    results = apply_many(pairs, icon_dir=icon_dir, cache=cache, backend=backend, size=SIZE)
+
+    assert [r.ok for r in results] == [True, True, True]
+    assert [r.icon for r in results] == ["folder-src", "python", "folder-src"]
+    assert backend.read(project / "src") == uri(cache, icon_dir, "folder-src")
+    assert backend.read(project / "main.py") == uri(cache, icon_dir, "python")
+
+
+def test_apply_many_reports_failures_per_target(icon_dir, cache, project):
+    backend = FakeBackend(fail=[project / "docs"])
+    pairs = [
+        (project / "missing", "python"),
+        (project / "src", "no-such-icon"),
+        (project / "docs", "folder-src"),
+        (project / "main.py", "python"),
+    ]
+    results = apply_many(pairs, icon_dir=icon_dir, cache=cache, backend=backend, size=SIZE)
+
+    assert [r.ok for r in results] == [False, False, False, True]
+    assert results[0].message == "Target does not exist"
+    assert "no-such-icon" in results[1].message
+    assert backend.read(project / "src") is None
+    assert backend.read(project / "main.py") == uri(cache, icon_dir, "python")
+
+
+def test_apply_many_journals_applies_and_resets(icon_dir, cache, project, journal):
+    backend = FakeBackend()
+    apply_many(
+        [(project / "src", "folder-src"), (project / "main.py", "python")],
+        icon_dir=icon_dir, cache=cache, backend=backend, size=SIZE, journal=journal,
+    )
+    entries = {e.target: e for e in journal.entries()}
+    assert set(entries) == {str(project / "src"), str(project / "main.py")}
+    assert entries[str(project / "src")].icon == "folder-src"
+    assert entries[str(project / "src")].value == uri(cache, icon_dir, "folder-src")
+
+    results = apply_many([(project / "src", None)], icon_dir=icon_dir, cache=cache, backend=backend, journal=journal)
+    assert results[0].ok
+    assert backend.read(project / "src") is None
+    assert [e.target for e in journal.entries()] == [str(project / "main.py")]
+
+
+def test_failed_writes_are_not_journaled(icon_dir, cache, project, journal):
+    backend = FakeBackend(fail=[project / "src"])
+    apply_many(
+        [(project / "src", "folder-src"), (project / "main.py", "python")],
+        icon_dir=icon_dir, cache=cache, backend=backend, size=SIZE, journal=journal,
+    )
+    assert [e.target for e in journal.entries()] == [str(project / "main.py")]
+
+
+def test_reset_icon_clears_both_attributes_and_the_journal(project, journal):
+    backend = FakeBackend()
+    target = project / "src"
+    backend.write(target, "file:///tmp/icon.png")
+    backend.write(target, "folder-icon-changer-folder-src", CUSTOM_ICON_NAME)
+    journal.record_many([(target, "folder-src", SIZE, False, "file:///tmp/icon.png")])
+
+    result = reset_icon(target, backend, journal)
+
+    assert result.ok and result.icon is None
+    assert backend.read(target, CUSTOM_ICON) is None
+    assert backend.read(target, CUSTOM_ICON_NAME) is None
+    assert len(journal) == 0
+
+
+def test_reset_icon_keeps_the_journal_entry_when_the_write_fails(project, journal):
+    target = project / "src"
+    journal.record_many([(target, "folder-src", SIZE, False, "file:///tmp/icon.png")])
+
+    result = reset_icon(target, FakeBackend(fail=[target]), journal)
+
+    assert not result.ok
+    assert len(journal) == 1
+
+
+def test_auto_iconize_applies_matches_in_batches(icon_dir, cache, project, journal):
+    backend = FakeBackend()
+    resolver = IconResolver(sorted(icon_dir.glob("*.svg")))
+    stats = tree.auto_iconize(project, backend=backend, resolver=resolver, journal=journal, batch_size=2)
+
+    assert stats["scanned"] == 4
+    assert stats["matched"] == stats["applied"] == 3
+    assert stats["failed"] == []
+    assert backend.read(project / "src") == uri(cache, icon_dir, "folder-src")
+    assert backend.read(project / "test") == uri(cache, icon_dir, "folder-test")
+    assert backend.read(project / "main.py") == uri(cache, icon_dir, "python")
+    assert backend.read(project / "docs") is None
+    assert {e.target: e.icon for e in journal.entries()} == {
+        str(project / "src"): "folder-src",
+        str(project / "test"): "folder-test",
+        str(project / "main.py"): "python",
+    }
+
+
+def test_auto_iconize_dry_run_writes_nothing(icon_dir, project):
+    backend = FakeBackend()
+    resolver = IconResolver(sorted(icon_dir.glob("*.svg")))
+    matches = []
+    stats = tree.auto_iconize(project, dry_run=True, backend=backend, resolver=resolver, report=lambda p, i: matches.append(i))
+
+    assert sorted(matches) == ["folder-src", "folder-test", "python"]
+    assert stats["applied"] == 0
+    assert backend.writes == 0
+
+
+def test_auto_iconize_counts_a_failed_batch(icon_dir, cache, project):
+    class BrokenBackend(FakeBackend):
+        def write_many(self, items, attribute=CUSTOM_ICON):
+            raise OSError("metadata store unavailable")
+
+    resolver = IconResolver(sorted(icon_dir.glob("*.svg")))
+    stats = tree.auto_iconize(project, backend=BrokenBackend(), resolver=resolver)
+
+    assert stats["applied"] == 0
+    assert len(stats["failed"]) == 3
+    assert all("metadata store unavailable" in error for _, error in stats["failed"])
+